@@ -1,9 +1,11 @@
 import streamlit as st
-from auth import init_session_state, show_auth_page
+from auth import init_session_state, show_auth_page, resume_session, apply_revalidation, sync_session_cookie, write_session_cookie, is_admin
 from pages_landing import show_landing_page
 from pages_planner import show_planner_page
 from pages_history import show_history_page
 from pages_profile import show_profile_page
+from profiling import run_page, show_profiling_controls
+from speculation import show_speculation_stats
 
 st.set_page_config(
     page_title="Meal & Exercise Planner",
@@ -12,6 +14,10 @@ st.set_page_config(
 )
 
 init_session_state()
+resume_session()
+apply_revalidation()
+sync_session_cookie()
+write_session_cookie()
 
 def show_navigation():
     """Display navigation sidebar for authenticated users."""
@@ -33,6 +39,11 @@ def show_navigation():
         
         st.markdown("---")
         
+        if is_admin():
+            show_profiling_controls()
+            show_speculation_stats()
+            st.markdown("---")
+        
         st.markdown("""
             <div style='text-align: center; color: gray; font-size: 0.85em; padding: 1rem;'>
             <p>🏋️ Meal & Exercise Planner</p>
@@ -41,22 +52,22 @@ def show_navigation():
         """, unsafe_allow_html=True)
 
 if st.session_state.current_page == 'landing':
-    show_landing_page()
+    run_page(show_landing_page)
 
 elif st.session_state.current_page == 'auth':
-    show_auth_page()
+    run_page(show_auth_page)
 
 elif st.session_state.authenticated:
     show_navigation()
     
     if st.session_state.current_page == 'planner':
-        show_planner_page()
+        run_page(show_planner_page)
     
     elif st.session_state.current_page == 'history':
-        show_history_page()
+        run_page(show_history_page)
     
     elif st.session_state.current_page == 'profile':
-        show_profile_page()
+        run_page(show_profile_page)
 
 else:
     st.session_state.current_page = 'landing'
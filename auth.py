@@ -1,8 +1,24 @@
+import json
+import time
 import streamlit as st
+import streamlit.components.v1 as components
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional, Dict, Any
+from urllib.parse import unquote
+from cache import invalidate, namespace, register_invalidation
+from speculation import default_requests, speculate_defaults
+from stats import parse_nutrition
 from supabase_client import get_supabase
 
+SESSION_COOKIE = 'mep_refresh_token'
+SESSION_COOKIE_MAX_AGE = 30 * 24 * 60 * 60
+SNAPSHOT_MAX_AGE = 5 * 60
+PROFILE_CACHE_TTL = 10 * 60
+HISTORY_CACHE_TTL = 10 * 60
+
+_revalidator = ThreadPoolExecutor(max_workers=4, thread_name_prefix='revalidate')
+
 def init_session_state():
     """Initialize session state variables."""
     if 'authenticated' not in st.session_state:
@@ -17,6 +33,14 @@ def init_session_state():
         st.session_state.current_page = 'landing'
     if 'plan_history' not in st.session_state:
         st.session_state.plan_history = []
+    if 'resume_attempted' not in st.session_state:
+        st.session_state.resume_attempted = False
+    if 'is_admin' not in st.session_state:
+        st.session_state.is_admin = False
+
+def is_admin() -> bool:
+    """Return True if the signed-in user has a row in the `admins` table."""
+    return bool(st.session_state.get('authenticated') and st.session_state.get('is_admin'))
 
 def _safe_data(res: Any) -> Any:
     """Return the 'data' field from a Supabase response regardless of shape."""
@@ -27,11 +51,38 @@ def _safe_data(res: Any) -> Any:
         data = res.get('data')
     return data
 
-def _fetch_profile(user_id: str) -> Dict[str, Any]:
-    sb = get_supabase()
+def _profile_cache():
+    return namespace('profiles', ttl=PROFILE_CACHE_TTL)
+
+def _history_cache():
+    return namespace('plan_history', ttl=HISTORY_CACHE_TTL)
+
+def _snapshot_cache():
+    # Last known profile/history per user, used to rehydrate resumed sessions
+    return namespace('snapshots', ttl=SESSION_COOKIE_MAX_AGE)
+
+register_invalidation('profile', lambda user_id: _profile_cache().delete(user_id))
+register_invalidation('plans', lambda user_id: _history_cache().delete(user_id))
+
+def _fetch_profile(user_id: str, sb: Any = None, use_cache: bool = True) -> Dict[str, Any]:
+    if use_cache:
+        cached = _profile_cache().get(user_id)
+        if cached:
+            return cached
+    sb = sb or get_supabase()
     res = sb.table('profiles').select('*').eq('id', user_id).maybe_single().execute()
-    data = _safe_data(res)
-    return data or {}
+    data = _safe_data(res) or {}
+    if data:
+        _profile_cache().set(user_id, data)
+    return data
+
+def _fetch_is_admin(user_id: str) -> bool:
+    """Check the `admins` table; RLS only exposes the caller's own row."""
+    try:
+        res = get_supabase().table('admins').select('user_id').eq('user_id', user_id).maybe_single().execute()
+    except Exception:
+        return False
+    return bool(_safe_data(res))
 
 def _ensure_profile(user_id: str, username: Optional[str], email: Optional[str]) -> Dict[str, Any]:
     sb = get_supabase()
@@ -49,8 +100,12 @@ def _ensure_profile(user_id: str, username: Optional[str], email: Optional[str])
     sb.table('profiles').insert(payload).execute()
     return payload
 
-def _refresh_plan_history(user_id: str) -> None:
-    sb = get_supabase()
+def _fetch_plan_history(user_id: str, sb: Any = None, use_cache: bool = True) -> list:
+    if use_cache:
+        cached = _history_cache().get(user_id)
+        if cached is not None:
+            return cached
+    sb = sb or get_supabase()
     res = (
         sb.table('plans')
         .select('*')
@@ -59,8 +114,144 @@ def _refresh_plan_history(user_id: str) -> None:
         .limit(20)
         .execute()
     )
-    data = _safe_data(res)
-    st.session_state.plan_history = data or []
+    data = _safe_data(res) or []
+    _history_cache().set(user_id, data)
+    return data
+
+def _cancel_revalidation() -> None:
+    """Drop any background revalidation in flight; every write must call this.
+
+    The fetch started before the write, so applying it later would bring back
+    the state the write just replaced.
+    """
+    future = st.session_state.pop('_revalidation', None)
+    if future is not None:
+        future.cancel()
+
+def _refresh_plan_history(user_id: str) -> None:
+    st.session_state.plan_history = _fetch_plan_history(user_id)
+    _save_snapshot(user_id)
+
+def _save_snapshot(user_id: str) -> None:
+    _snapshot_cache().set(user_id, {
+        'user_data': dict(st.session_state.user_data),
+        'plan_history': list(st.session_state.plan_history),
+        'cached_at': time.time(),
+    })
+
+def _revalidate(sb: Any, user_id: str) -> tuple[Dict[str, Any], list]:
+    """Fetch fresh profile and history off the script thread."""
+    return _fetch_profile(user_id, sb, use_cache=False), _fetch_plan_history(user_id, sb, use_cache=False)
+
+def _persist_refresh_token(token: Optional[str]) -> None:
+    """Queue the refresh token cookie to be written (or cleared) on the next render."""
+    st.session_state.pending_session_cookie = token or ''
+    st.session_state.persisted_refresh_token = token or None
+
+def sync_session_cookie() -> None:
+    """Re-queue the cookie when the client has rotated the refresh token.
+
+    supabase-py refreshes the access token on its own (roughly hourly) and each
+    refresh rotates the refresh token, so the cookie must follow it or the next
+    resume would replay a token that has already been used.
+    """
+    if not st.session_state.get('authenticated'):
+        return
+    try:
+        session = get_supabase().auth.get_session()
+    except Exception:
+        return
+    token = getattr(session, 'refresh_token', None)
+    if token and token != st.session_state.get('persisted_refresh_token'):
+        _persist_refresh_token(token)
+
+def write_session_cookie() -> None:
+    """Write or clear the session resumption cookie in the browser if one is queued."""
+    if 'pending_session_cookie' not in st.session_state:
+        return
+    token = st.session_state.pop('pending_session_cookie')
+    max_age = SESSION_COOKIE_MAX_AGE if token else 0
+    components.html(f"""<script>
+        const secure = window.parent.location.protocol === 'https:' ? '; Secure' : '';
+        window.parent.document.cookie = '{SESSION_COOKIE}=' + encodeURIComponent({json.dumps(token)})
+            + '; Max-Age={max_age}; Path=/; SameSite=Strict' + secure;
+    </script>""", height=0)
+
+def resume_session() -> None:
+    """Restore a signed-in session from the refresh token cookie, once per browser session.
+
+    The profile and plan history are rehydrated from the last snapshot when one
+    exists; stale snapshots are revalidated in the background and applied on a
+    later rerun by apply_revalidation. Default plans are pre-generated as on
+    sign_in.
+    """
+    if st.session_state.authenticated or st.session_state.resume_attempted:
+        return
+    st.session_state.resume_attempted = True
+    token = st.context.cookies.get(SESSION_COOKIE)
+    if not token:
+        return
+
+    sb = get_supabase()
+    try:
+        result = sb.auth.refresh_session(unquote(token))
+    except Exception:
+        _persist_refresh_token(None)
+        return
+    user = getattr(result, 'user', None)
+    session = getattr(result, 'session', None)
+    if not user or not session:
+        _persist_refresh_token(None)
+        return
+
+    try:
+        snapshot = _snapshot_cache().get(user.id)
+        if snapshot:
+            user_data = dict(snapshot['user_data'])
+            plan_history = list(snapshot['plan_history'])
+        else:
+            user_data = _ensure_profile(user.id, username=None, email=user.email)
+            plan_history = _fetch_plan_history(user.id)
+    except Exception:
+        # Leave the user signed out rather than half signed in; they can sign in again
+        _persist_refresh_token(None)
+        return
+
+    # Refresh tokens are single use, so store the rotated one
+    _persist_refresh_token(session.refresh_token)
+    st.session_state.authenticated = True
+    st.session_state.user_id = user.id
+    st.session_state.user_data = user_data
+    st.session_state.plan_history = plan_history
+    if not snapshot:
+        _save_snapshot(user.id)
+    elif time.time() - snapshot['cached_at'] > SNAPSHOT_MAX_AGE:
+        st.session_state._revalidation = _revalidator.submit(_revalidate, sb, user.id)
+
+    st.session_state.is_admin = _fetch_is_admin(user.id)
+    email = st.session_state.user_data.get('email') or user.email
+    st.session_state.username = st.session_state.user_data.get('username') or (email.split('@')[0] if email else None)
+    if st.session_state.current_page in ('landing', 'auth'):
+        st.session_state.current_page = 'planner'
+    # Returning users mostly arrive this way rather than through sign_in
+    speculate_defaults(user.id, user_data)
+
+def apply_revalidation() -> None:
+    """Swap in background-revalidated profile/history once the fetch has finished."""
+    future = st.session_state.get('_revalidation')
+    if future is None or not future.done():
+        return
+    st.session_state.pop('_revalidation', None)
+    if future.exception() is not None or not st.session_state.get('user_id'):
+        return
+    profile, history = future.result()
+    if profile:
+        if default_requests(profile) != default_requests(st.session_state.user_data):
+            # The snapshot's defaults were stale; pre-generate for the current ones
+            speculate_defaults(st.session_state.user_id, profile)
+        st.session_state.user_data = profile
+    st.session_state.plan_history = history
+    _save_snapshot(st.session_state.user_id)
 
 def sign_up(username: str, password: str, email: str) -> tuple[bool, str]:
     """Register a new user in Supabase Auth and create a profile."""
@@ -101,8 +292,12 @@ def sign_in(email: str, password: str) -> tuple[bool, str]:
         st.session_state.user_id = user.id
         profile = _ensure_profile(user.id, username=None, email=email)
         st.session_state.user_data = profile
+        st.session_state.is_admin = _fetch_is_admin(user.id)
         st.session_state.username = profile.get('username') or (email.split('@')[0] if email else None)
         _refresh_plan_history(user.id)
+        auth_session = getattr(session, 'session', None)
+        _persist_refresh_token(getattr(auth_session, 'refresh_token', None))
+        speculate_defaults(user.id, profile)
         return True, "Successfully logged in!"
     except Exception as e:
         return False, f"Login failed: {e}"
@@ -113,26 +308,36 @@ def sign_out():
         get_supabase().auth.sign_out()
     except Exception:
         pass
+    if st.session_state.get('user_id'):
+        _snapshot_cache().delete(st.session_state.user_id)
     st.session_state.authenticated = False
+    st.session_state.is_admin = False
     st.session_state.username = None
     st.session_state.user_id = None
     st.session_state.user_data = {}
     st.session_state.plan_history = []
     st.session_state.current_page = 'landing'
+    _cancel_revalidation()
+    _persist_refresh_token(None)
 
 def update_user_data(username: str, data: Dict[str, Any]) -> None:
     """Update user profile in Supabase and session state."""
     if not st.session_state.get('user_id'):
         return
+    _cancel_revalidation()
     user_id: str = st.session_state.user_id
     sb = get_supabase()
     sb.table('profiles').update(data).eq('id', user_id).execute()
+    invalidate('profile', user_id)
     st.session_state.user_data = {**st.session_state.user_data, **data}
+    _save_snapshot(user_id)
+    speculate_defaults(user_id, st.session_state.user_data)
 
 def add_plan_to_history(plan_type: str, plan_content: str, goal: str) -> None:
     """Add a generated plan to user's history in Supabase."""
     if not st.session_state.get('authenticated') or not st.session_state.get('user_id'):
         return
+    _cancel_revalidation()
     sb = get_supabase()
     plan_entry = {
         'user_id': st.session_state.user_id,
@@ -141,17 +346,49 @@ def add_plan_to_history(plan_type: str, plan_content: str, goal: str) -> None:
         'goal': goal,
         'created_at': datetime.now().isoformat()
     }
+    if plan_type == 'meal':
+        plan_entry['avg_daily_calories'], plan_entry['avg_daily_protein'] = parse_nutrition(plan_content)
     sb.table('plans').insert(plan_entry).execute()
+    invalidate('plans', st.session_state.user_id)
     _refresh_plan_history(st.session_state.user_id)
 
+def update_plan_content(plan_id: str, plan_content: str) -> None:
+    """Patch a stored plan's content in Supabase and in the local history."""
+    if not st.session_state.get('user_id'):
+        return
+    _cancel_revalidation()
+    sb = get_supabase()
+    update: Dict[str, Any] = {'content': plan_content}
+    plan = next((p for p in st.session_state.plan_history if p.get('id') == plan_id), None)
+    if plan and plan.get('type') == 'meal':
+        update['avg_daily_calories'], update['avg_daily_protein'] = parse_nutrition(plan_content)
+    sb.table('plans').update(update).eq('id', plan_id).eq('user_id', st.session_state.user_id).execute()
+    invalidate('plans', st.session_state.user_id)
+    if plan:
+        plan.update(update)
+    _save_snapshot(st.session_state.user_id)
+
 def delete_plan(plan_id: str) -> None:
     """Delete a plan by id and refresh local history."""
     if not st.session_state.get('user_id'):
         return
+    _cancel_revalidation()
     sb = get_supabase()
     sb.table('plans').delete().eq('id', plan_id).eq('user_id', st.session_state.user_id).execute()
+    invalidate('plans', st.session_state.user_id)
     _refresh_plan_history(st.session_state.user_id)
 
+def clear_plan_history() -> None:
+    """Delete all of the current user's plans."""
+    if not st.session_state.get('user_id'):
+        return
+    _cancel_revalidation()
+    user_id: str = st.session_state.user_id
+    get_supabase().table('plans').delete().eq('user_id', user_id).execute()
+    invalidate('plans', user_id)
+    st.session_state.plan_history = []
+    _save_snapshot(user_id)
+
 def show_auth_page():
     """Display authentication page with sign in/sign up."""
     st.title("Welcome to Meal & Exercise Planner")
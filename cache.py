@@ -0,0 +1,318 @@
+import getpass
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+import streamlit as st
+
+KEY_PREFIX = "mep"
+# Per-user directory so other accounts on the host cannot read cached profiles or sessions
+DEFAULT_SQLITE_DIR = os.path.join(tempfile.gettempdir(), f"meal_planner-{getpass.getuser()}")
+DEFAULT_SQLITE_PATH = os.path.join(DEFAULT_SQLITE_DIR, "cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_VALUE_BYTES = 1024 * 1024
+
+
+class CacheBackend:
+    """Interface for the shared cache tier.
+
+    Values must be JSON-serializable; they are stored as JSON so entries can be
+    read by any replica and never unpickled from a shared store.
+    """
+
+    def __init__(self, max_value_bytes: int = DEFAULT_MAX_VALUE_BYTES):
+        self.max_value_bytes = max_value_bytes
+
+    def _encode(self, value: Any) -> Optional[str]:
+        raw = json.dumps(value, ensure_ascii=False)
+        if len(raw.encode('utf-8')) > self.max_value_bytes:
+            return None
+        return raw
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Atomically add amount to an integer counter and return the new value.
+
+        The TTL is only applied when the counter is created.
+        """
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix: str) -> None:
+        raise NotImplementedError
+
+
+class SQLiteCache(CacheBackend):
+    """Cache backed by a SQLite file, safe to share between processes on one host.
+
+    Uses WAL mode so readers never block the writer, and trims the oldest
+    entries once the table grows past max_entries.
+    """
+
+    EVICT_EVERY = 64
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_value_bytes: int = DEFAULT_MAX_VALUE_BYTES):
+        super().__init__(max_value_bytes)
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._create_private(path)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, stored_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_stored_at ON cache (stored_at)")
+
+    @staticmethod
+    def _create_private(path: str) -> None:
+        """Create the database file (and its directory) readable only by this user.
+
+        SQLite gives the -wal and -shm files the same permissions as the database.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        if directory == DEFAULT_SQLITE_DIR:
+            info = os.lstat(directory)
+            if not os.path.isdir(directory) or os.path.islink(directory) or (
+                    hasattr(os, 'getuid') and info.st_uid != os.getuid()):
+                raise RuntimeError(f"Refusing to use cache directory not owned by this user: {directory}")
+            os.chmod(directory, 0o700)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        os.close(fd)
+        os.chmod(path, 0o600)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(key)
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raw = self._encode(value)
+        if raw is None:
+            self.delete(key)
+            return
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)",
+            (key, raw, now + ttl if ttl else None, now),
+        )
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self._evict(now)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                value, expires_at = amount, (now + ttl if ttl else None)
+            else:
+                value, expires_at = int(json.loads(row[0])) + amount, row[1]
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def _evict(self, now: float) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY stored_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix: str) -> None:
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        self._conn().execute("DELETE FROM cache WHERE key LIKE ? ESCAPE '\\'", (escaped + '%',))
+
+
+class RedisCache(CacheBackend):
+    """Cache backed by any server speaking the Redis protocol (Redis, Valkey, KeyDB...).
+
+    Entry count is bounded by the server's maxmemory policy; every key written
+    through this class carries a TTL so nothing outlives default_ttl. Needs
+    Redis 2.8+ (SET PX/NX and SCAN) or a compatible server.
+    """
+
+    def __init__(self, url: str, default_ttl: float = 24 * 60 * 60,
+                 max_value_bytes: int = DEFAULT_MAX_VALUE_BYTES):
+        super().__init__(max_value_bytes)
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_URL points at Redis but the 'redis' package is not installed. Run: pip install redis") from e
+        self.default_ttl = default_ttl
+        self.client = redis.Redis.from_url(url, decode_responses=True, socket_timeout=2, protocol=2)
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raw = self._encode(value)
+        if raw is None:
+            self.client.delete(key)
+            return
+        self.client.set(key, raw, px=int((ttl or self.default_ttl) * 1000))
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        # SET NX seeds the counter with its TTL only when it does not exist yet
+        pipe = self.client.pipeline()
+        pipe.set(key, 0, px=int((ttl or self.default_ttl) * 1000), nx=True)
+        pipe.incrby(key, amount)
+        _, value = pipe.execute()
+        return int(value)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def delete_prefix(self, prefix: str) -> None:
+        pattern = ''.join('\\' + c if c in '*?[]\\' else c for c in prefix) + '*'
+        batch: List[str] = []
+        for key in self.client.scan_iter(match=pattern, count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                self.client.delete(*batch)
+                batch = []
+        if batch:
+            self.client.delete(*batch)
+
+
+class Namespace:
+    """A view of the cache whose keys are prefixed with a namespace name."""
+
+    def __init__(self, backend: CacheBackend, name: str, ttl: Optional[float] = None):
+        self.backend = backend
+        self.prefix = f"{KEY_PREFIX}:{name}:"
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            return self.backend.get(self.prefix + key)
+        except Exception:
+            # The cache is an optimization; an unavailable backend means a miss
+            return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            self.backend.set(self.prefix + key, value, ttl or self.ttl)
+        except Exception:
+            pass
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> Optional[int]:
+        try:
+            return self.backend.incr(self.prefix + key, amount, ttl or self.ttl)
+        except Exception:
+            return None
+
+    def delete(self, key: str) -> None:
+        try:
+            self.backend.delete(self.prefix + key)
+        except Exception:
+            pass
+
+    def clear(self) -> None:
+        try:
+            self.backend.delete_prefix(self.prefix)
+        except Exception:
+            pass
+
+
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+_invalidation_hooks: Dict[str, List[Callable[[str], None]]] = defaultdict(list)
+
+
+def _create_backend() -> CacheBackend:
+    """Build the backend named by CACHE_URL from Streamlit secrets or environment.
+
+    Supported values:
+      - sqlite:///path/to/cache.sqlite3 (default: a private per-user folder in the system temp dir)
+      - redis://host:port/db or rediss://...
+    """
+    url: Optional[str] = None
+    if hasattr(st, "secrets") and "CACHE_URL" in st.secrets:
+        url = st.secrets["CACHE_URL"]
+    else:
+        url = os.environ.get("CACHE_URL")
+
+    if not url:
+        return SQLiteCache()
+    parsed = urlparse(url)
+    if parsed.scheme in ('redis', 'rediss', 'unix'):
+        return RedisCache(url)
+    if parsed.scheme == 'sqlite':
+        return SQLiteCache(parsed.path or DEFAULT_SQLITE_PATH)
+    raise RuntimeError(f"Unsupported CACHE_URL scheme: {parsed.scheme}")
+
+
+def get_cache() -> CacheBackend:
+    """Return the process-wide shared cache backend."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _create_backend()
+    return _backend
+
+
+def namespace(name: str, ttl: Optional[float] = None) -> Namespace:
+    """Return a namespaced view of the shared cache with a default TTL in seconds."""
+    return Namespace(get_cache(), name, ttl)
+
+
+def register_invalidation(event: str, hook: Callable[[str], None]) -> None:
+    """Run hook(user_id) whenever invalidate(event, user_id) is called."""
+    _invalidation_hooks[event].append(hook)
+
+
+def invalidate(event: str, user_id: str) -> None:
+    """Drop cached entries affected by a write. Events: 'profile', 'plans'."""
+    for hook in _invalidation_hooks[event]:
+        try:
+            hook(user_id)
+        except Exception:
+            pass
@@ -0,0 +1,206 @@
+"""Smoke check for the shared cache backends.
+
+Runs the same get/set/TTL/incr/delete_prefix checks against SQLiteCache and
+RedisCache. RedisCache is exercised against a small in-process server that
+speaks the subset of the Redis protocol the cache uses, or against a real
+server when --redis-url is given.
+
+Usage:
+    python check_cache.py
+    python check_cache.py --redis-url redis://localhost:6379/15
+"""
+import argparse
+import os
+import re
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from cache import CacheBackend, Namespace, RedisCache, SQLiteCache
+
+
+def _glob_to_regex(pattern: str) -> re.Pattern:
+    """Translate a Redis glob (with backslash escapes) into a regex."""
+    out, i = [], 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\' and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        out.append('.*' if c == '*' else '.' if c == '?' else re.escape(c))
+        i += 1
+    return re.compile(''.join(out) + r'\Z', re.DOTALL)
+
+
+class _StandInStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+
+    def _live(self, key: bytes) -> Optional[bytes]:
+        item = self.data.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= time.time():
+            del self.data[key]
+            return None
+        return item[0]
+
+    def execute(self, args: List[bytes]):
+        cmd = args[0].upper()
+        with self.lock:
+            if cmd == b'PING':
+                return b'+PONG'
+            if cmd in (b'SELECT', b'CLIENT'):
+                return b'+OK'
+            if cmd == b'GET':
+                return self._live(args[1])
+            if cmd == b'SET':
+                key, value, opts = args[1], args[2], [a.upper() for a in args[3:]]
+                expires = None
+                if b'PX' in opts:
+                    expires = time.time() + int(args[3 + opts.index(b'PX') + 1]) / 1000
+                if b'EX' in opts:
+                    expires = time.time() + int(args[3 + opts.index(b'EX') + 1])
+                if b'NX' in opts and self._live(key) is not None:
+                    return None
+                self.data[key] = (value, expires)
+                return b'+OK'
+            if cmd == b'INCRBY':
+                current = self._live(args[1])
+                value = int(current or 0) + int(args[2])
+                expires = self.data[args[1]][1] if current is not None else None
+                self.data[args[1]] = (str(value).encode(), expires)
+                return value
+            if cmd == b'DEL':
+                return sum(1 for key in args[1:] if self._live(key) is not None and self.data.pop(key))
+            if cmd == b'SCAN':
+                opts = [a.upper() for a in args]
+                pattern = args[opts.index(b'MATCH') + 1].decode() if b'MATCH' in opts else '*'
+                regex = _glob_to_regex(pattern)
+                keys = [k for k in list(self.data) if self._live(k) is not None and regex.match(k.decode())]
+                return [b'0', keys]
+        return ValueError(f"ERR unknown command '{cmd.decode()}'")
+
+
+def _encode(value) -> bytes:
+    if isinstance(value, ValueError):
+        return b'-' + str(value).encode() + b'\r\n'
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, bytes) and value[:1] == b'+':
+        return value + b'\r\n'
+    if isinstance(value, bytes):
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+    return b'*%d\r\n' % len(value) + b''.join(_encode(v) for v in value)
+
+
+class _StandInHandler(socketserver.StreamRequestHandler):
+    def _read_command(self) -> Optional[List[bytes]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def handle(self):
+        store: _StandInStore = self.server.store
+        queued: Optional[List[List[bytes]]] = None
+        while True:
+            args = self._read_command()
+            if not args:
+                return
+            cmd = args[0].upper()
+            if cmd == b'MULTI':
+                queued = []
+                self.wfile.write(b'+OK\r\n')
+            elif cmd == b'EXEC':
+                results = [store.execute(a) for a in queued or []]
+                queued = None
+                self.wfile.write(_encode(results))
+            elif queued is not None:
+                queued.append(args)
+                self.wfile.write(b'+QUEUED\r\n')
+            else:
+                self.wfile.write(_encode(store.execute(args)))
+
+
+class RedisStandIn(socketserver.ThreadingTCPServer):
+    """In-process server implementing the Redis commands RedisCache relies on."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _StandInHandler)
+        self.store = _StandInStore()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+
+def check_backend(backend: CacheBackend) -> None:
+    ns = Namespace(backend, 'check', ttl=60)
+    ns.clear()
+
+    ns.set('profile', {'email': 'a@example.com', 'goals': ['Maintenance']})
+    assert ns.get('profile') == {'email': 'a@example.com', 'goals': ['Maintenance']}, 'get/set round trip'
+    assert ns.get('missing') is None, 'miss returns None'
+
+    ns.set('short', 'x', ttl=0.2)
+    time.sleep(0.3)
+    assert ns.get('short') is None, 'TTL expiry'
+
+    assert ns.incr('counter') == 1 and ns.incr('counter', 4) == 5, 'incr'
+    assert ns.get('counter') == 5, 'incr value readable with get'
+
+    backend.max_value_bytes, limit = 16, backend.max_value_bytes
+    ns.set('big', 'x' * 100)
+    backend.max_value_bytes = limit
+    assert ns.get('big') is None, 'values over max_value_bytes are not stored'
+
+    other = Namespace(backend, 'check_other', ttl=60)
+    other.set('keep', 1)
+    ns.set('user:1', 1)
+    ns.set('user_[1]*', 2)
+    ns.clear()
+    assert ns.get('user:1') is None and ns.get('user_[1]*') is None, 'delete_prefix clears namespace'
+    assert other.get('keep') == 1, 'delete_prefix leaves other namespaces (and glob/LIKE characters are escaped)'
+    other.clear()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--redis-url', help='Check against a real Redis-protocol server instead of the stand-in')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        check_backend(SQLiteCache(os.path.join(tmp, 'cache.sqlite3')))
+        print("SQLiteCache: OK")
+
+    standin = None
+    url = args.redis_url
+    if not url:
+        standin = RedisStandIn()
+        url = standin.url
+    check_backend(RedisCache(url))
+    print(f"RedisCache ({'stand-in' if standin else url}): OK")
+    if standin:
+        standin.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
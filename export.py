@@ -0,0 +1,32 @@
+from typing import Optional
+from supabase_client import get_supabase
+
+EXPORT_FUNCTION = 'export-plans'
+EXPORT_FORMATS = {
+    'JSONL': ('jsonl', 'application/x-ndjson'),
+    'CSV': ('csv', 'text/csv'),
+    'Printable document': ('html', 'text/html'),
+}
+
+
+def create_export_link(fmt: str, user_id: str, all_users: bool = False) -> str:
+    """Return a single-use link that streams an export of the plan history.
+
+    The export is served by the `export-plans` Supabase Edge Function
+    (supabase/functions/export-plans), which pages through the `plans` table
+    with a keyset cursor and writes each page to the response as the browser
+    reads it. Nothing is buffered on the Streamlit server. The link carries a
+    ticket that expires after five minutes and is deleted on first use; RLS
+    only lets admins mint all-users tickets.
+    """
+    ext, _ = EXPORT_FORMATS[fmt]
+    sb = get_supabase()
+    res = sb.table('export_tickets').insert({
+        'user_id': user_id,
+        'format': ext,
+        'all_users': all_users,
+    }).execute()
+    rows = getattr(res, 'data', None) or []
+    if not rows:
+        raise RuntimeError("Could not create an export ticket")
+    return f"{str(sb.functions_url).rstrip('/')}/{EXPORT_FUNCTION}?ticket={rows[0]['id']}"
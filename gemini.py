@@ -1,5 +1,7 @@
 import os
+import re
 import streamlit as st
+from typing import List, Optional, Tuple
 from google import genai
 from google.genai import types
 
@@ -131,3 +133,176 @@ Provide the exercise plan in a clear, organized format with specific sets, reps,
         return response.text or "Unable to generate exercise plan. Please try again."
     except Exception as e:
         return f"Error generating exercise plan: {str(e)}"
+
+
+DAY_HEADER = re.compile(r'^[ \t#*_]*Day\s+([1-7])\b', re.IGNORECASE | re.MULTILINE)
+MEALS = ["Breakfast", "Lunch", "Dinner", "Snacks"]
+# A heading on its own line: markdown "#" or a fully bold line such as "**Tips:**"
+SECTION_HEADING = re.compile(r'^(?:(#{1,6})[ \t]+\S[^\n]*|\*\*[^*\n]+\*\*:?[ \t]*)$', re.MULTILINE)
+# Headings that close the week rather than belong to Day 7 (warm-ups, workouts
+# and meals under the last day must stay with it)
+PLAN_SECTIONS = re.compile(
+    r'^[#*\s]*(?:(?:Weekly|Week|General|Additional|Important|Final|Key|Overall)\b[^\n]*'
+    r'|(?:Shopping|Grocery)\b[^\n]*|Tips\b|Summary\b|Meal Prep\b|Progression\b|Hydration\b|Disclaimer\b)',
+    re.IGNORECASE,
+)
+
+
+def _day_headers(content: str) -> List[re.Match]:
+    """The first header of each day; later mentions of a day (e.g. a closing summary) are skipped."""
+    matches, seen = [], set()
+    for match in DAY_HEADER.finditer(content):
+        if match.group(1) not in seen:
+            seen.add(match.group(1))
+            matches.append(match)
+    return matches
+
+
+def _heading_level(line: str) -> Optional[int]:
+    hashes = re.match(r'[ \t]*(#{1,6})[ \t]', line)
+    return len(hashes.group(1)) if hashes else None
+
+
+def _trailing_start(day_text: str) -> Optional[int]:
+    """Offset of the first plan-level section after the last day's content, if any.
+
+    A heading ends the day only when it names a plan-level section (shopping
+    list, tips, weekly summary...) or is a markdown heading at the same or a
+    higher level than a markdown day header.
+    """
+    header_end = day_text.find('\n')
+    if header_end == -1:
+        return None
+    day_level = _heading_level(day_text[:header_end])
+    for heading in SECTION_HEADING.finditer(day_text, header_end + 1):
+        level = len(heading.group(1)) if heading.group(1) else None
+        if PLAN_SECTIONS.match(heading.group(0)) or (level and day_level and level <= day_level):
+            return heading.start()
+    return None
+
+
+def split_plan_days(content: str) -> List[Tuple[Optional[int], str]]:
+    """
+    Split a stored weekly plan into per-day segments.
+    
+    Returns:
+        A list of (day, text) pairs in original order. Text before the first
+        day header, and plan-level sections after the last day (shopping
+        list, tips...), are returned with day None; joining all texts
+        reproduces the original content exactly.
+    """
+    segments: List[Tuple[Optional[int], str]] = []
+    matches = _day_headers(content)
+    if not matches:
+        return [(None, content)]
+    if matches[0].start() > 0:
+        segments.append((None, content[:matches[0].start()]))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(content)
+        segments.append((int(match.group(1)), content[match.start():end]))
+
+    # Returned separately so replacing the last day leaves them in place
+    last_day, last_text = segments[-1]
+    trailing = _trailing_start(last_text)
+    if trailing is not None:
+        segments[-1:] = [(last_day, last_text[:trailing]), (None, last_text[trailing:])]
+    return segments
+
+
+def replace_plan_day(content: str, day: int, new_segment: str) -> str:
+    """Return the plan with only the given day's segment swapped for new_segment."""
+    segments = split_plan_days(content)
+    if day not in [d for d, _ in segments]:
+        raise ValueError(f"Day {day} not found in plan")
+    patched = []
+    for seg_day, text in segments:
+        if seg_day == day:
+            # Keep the original spacing before the next day header
+            trailing = text[len(text.rstrip()):]
+            text = new_segment.strip() + (trailing or "\n\n")
+        patched.append(text)
+    return "".join(patched)
+
+
+def _regenerate_day(prompt: str, day: int) -> str:
+    client = get_client()
+    response = client.models.generate_content(
+        model="gemini-2.5-pro",
+        contents=prompt
+    )
+    text = (response.text or "").strip()
+    match = DAY_HEADER.search(text)
+    if not match or int(match.group(1)) != day:
+        raise ValueError(f"The AI response did not contain a Day {day} section. Please try again.")
+    # Drop any chatter before the header and any further days the model added;
+    # everything up to the next day header (warm-ups, tips) belongs to this day
+    later = [m for m in _day_headers(text) if m.start() > match.start()]
+    return text[match.start():later[0].start() if later else len(text)].strip()
+
+
+def regenerate_meal_day(goal: str, plan_content: str, day: int, meal: Optional[str] = None,
+                        feedback: str = "", dietary_preferences: str = "") -> str:
+    """
+    Regenerate a single day (or a single meal within it) of an existing meal plan.
+    
+    The rest of the week is sent as context so only one day is generated,
+    keeping output tokens to roughly a seventh of a full plan.
+    
+    Args:
+        goal: Fitness goal the plan was created for
+        plan_content: The full stored weekly meal plan
+        day: Day number (1-7) to regenerate
+        meal: Optional meal name (Breakfast, Lunch, Dinner, Snacks) to replace; None replaces the whole day
+        feedback: What the user disliked or wants changed
+        dietary_preferences: Any dietary restrictions or preferences
+        
+    Returns:
+        The replacement "Day X" segment as a string
+    """
+    target = f"ONLY the {meal} of Day {day}" if meal else f"ALL meals of Day {day}"
+    prompt = f"""You are a professional nutritionist and meal planner. Below is a user's current 7-day meal plan.
+
+GOAL: {goal}
+{f'DIETARY PREFERENCES: {dietary_preferences}' if dietary_preferences else ''}
+{f'USER FEEDBACK: {feedback}' if feedback else ''}
+
+CURRENT PLAN:
+{plan_content}
+
+Replace {target} with a different option that fits the goal and uses the same ingredients as the rest of the week.
+{'Keep every other meal of the day exactly as it is, and update the Daily Total.' if meal else 'Avoid repeating meals already used on other days.'}
+
+Respond with ONLY the rewritten Day {day} section, starting with its "**Day {day}:**" header and using exactly the same structure as the other days. Do not include any other days or commentary."""
+
+    return _regenerate_day(prompt, day)
+
+
+def regenerate_exercise_day(goal: str, plan_content: str, day: int,
+                            fitness_level: str = "intermediate", feedback: str = "") -> str:
+    """
+    Regenerate a single day of an existing exercise plan.
+    
+    Args:
+        goal: Fitness goal the plan was created for
+        plan_content: The full stored weekly exercise plan
+        day: Day number (1-7) to regenerate
+        fitness_level: User's fitness level (beginner, intermediate, advanced)
+        feedback: What the user disliked or wants changed
+        
+    Returns:
+        The replacement "Day X" segment as a string
+    """
+    prompt = f"""You are a certified personal trainer. Below is a user's current 7-day workout plan.
+
+GOAL: {goal}
+FITNESS LEVEL: {fitness_level}
+{f'USER FEEDBACK: {feedback}' if feedback else ''}
+
+CURRENT PLAN:
+{plan_content}
+
+Replace the workout for Day {day} with a different one that fits the goal, uses only the equipment already used in this plan (or bodyweight), and keeps muscle group coverage balanced with the rest of the week.
+
+Respond with ONLY the rewritten Day {day} section, starting with its "**Day {day}: [Workout Type]**" header and using exactly the same structure as the other days. Do not include any other days or commentary."""
+
+    return _regenerate_day(prompt, day)
@@ -0,0 +1,763 @@
+"""Capacity test that drives the real app.py through many concurrent simulated sessions.
+
+Each stage starts one Streamlit server for app.py, the same server
+`streamlit run` starts, with Supabase and Gemini replaced inside it by
+in-memory fakes whose response times follow log-normal distributions. Many
+simulated browsers then connect over the websocket protocol and walk a scripted
+journey (landing -> sign in -> generate plans -> browse/delete history -> save
+profile), so all sessions share the server's event loop, GIL, thread pools and
+cache, as they would on a replica. Concurrency is stepped up stage by stage and
+the report shows where throughput stops scaling, with the server's thread count
+and memory growth.
+
+The simulated browsers run in a few client processes on the same host and
+compete with the server for CPU; leave cores free for the server at high levels.
+
+Usage:
+    python loadtest.py --levels 10,50,100,200 --duration 60
+    python loadtest.py --levels 5,20 --duration 10 --time-scale 0.05   # quick smoke run
+    python loadtest.py --levels 50 --cache-url redis://localhost:6379/15
+"""
+import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+INGREDIENTS = ["chicken breast", "rice", "eggs", "spinach", "oats", "bananas", "almonds",
+               "salmon", "quinoa", "greek yogurt", "broccoli", "sweet potatoes", "lentils", "tofu"]
+EQUIPMENT = ["dumbbells", "resistance bands", "yoga mat", "pull-up bar", "kettlebell", "bench", "bodyweight"]
+SPECULATION_EVENTS = ('started', 'hit', 'miss', 'over_budget', 'over_capacity')
+
+
+class Latency:
+    """Log-normal latency distribution described by its median and 95th percentile (seconds)."""
+
+    def __init__(self, median: float, p95: float, time_scale: float = 1.0):
+        self.mu = math.log(median)
+        self.sigma = max(math.log(p95 / median) / 1.645, 1e-6)
+        self.time_scale = time_scale
+
+    def sleep(self, rng: random.Random) -> None:
+        time.sleep(rng.lognormvariate(self.mu, self.sigma) * self.time_scale)
+
+
+class FakeDatabase:
+    """Thread-safe in-memory stand-in for the Supabase tables used by the app."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.users: Dict[str, str] = {}
+
+
+class FakeQuery:
+    def __init__(self, client: "FakeSupabase", table: str):
+        self.client = client
+        self.table = table
+        self.filters: List[tuple] = []
+        self.action = 'select'
+        self.payload: Any = None
+        self.order_by: List[tuple] = []
+        self.limit_n: Optional[int] = None
+        self.single = False
+        self.count: Optional[str] = None
+        self.head = False
+
+    def select(self, columns: str = '*', count: Optional[str] = None, head: bool = False):
+        self.action, self.count, self.head = 'select', count, head
+        return self
+
+    def insert(self, payload):
+        self.action, self.payload = 'insert', payload
+        return self
+
+    def update(self, payload):
+        self.action, self.payload = 'update', payload
+        return self
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, '==', value))
+        return self
+
+    def gte(self, column, value):
+        self.filters.append((column, '>=', value))
+        return self
+
+    def or_(self, _filters):
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by.append((column, desc))
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        return self
+
+    def maybe_single(self):
+        self.single = True
+        return self
+
+    def _matches(self, row):
+        return all(
+            row.get(col) == value if op == '==' else (row.get(col) is not None and row.get(col) >= value)
+            for col, op, value in self.filters
+        )
+
+    def execute(self):
+        self.client.latency.sleep(self.client.rng)
+        db = self.client.db
+        with db.lock:
+            rows = db.tables[self.table]
+            if self.action == 'insert':
+                items = self.payload if isinstance(self.payload, list) else [self.payload]
+                inserted = [{'id': str(uuid.uuid4()), **item} for item in items]
+                rows.extend(inserted)
+                return SimpleNamespace(data=inserted, count=None)
+            if self.action == 'update':
+                matched = [row for row in rows if self._matches(row)]
+                for row in matched:
+                    row.update(self.payload)
+                return SimpleNamespace(data=[dict(r) for r in matched], count=None)
+            if self.action == 'delete':
+                matched = [row for row in rows if self._matches(row)]
+                db.tables[self.table] = [row for row in rows if not self._matches(row)]
+                return SimpleNamespace(data=matched, count=None)
+            matched = [dict(row) for row in rows if self._matches(row)]
+        for column, desc in reversed(self.order_by):
+            matched.sort(key=lambda r: r.get(column) or '', reverse=desc)
+        count = len(matched) if self.count else None
+        if self.limit_n is not None:
+            matched = matched[:self.limit_n]
+        if self.head:
+            matched = []
+        if self.single:
+            return SimpleNamespace(data=matched[0] if matched else None, count=count)
+        return SimpleNamespace(data=matched, count=count)
+
+
+class FakeAuth:
+    def __init__(self, client: "FakeSupabase"):
+        self.client = client
+
+    def _session(self, email: str):
+        db = self.client.db
+        with db.lock:
+            user_id = db.users.setdefault(email, str(uuid.uuid4()))
+        user = SimpleNamespace(id=user_id, email=email)
+        session = SimpleNamespace(access_token=uuid.uuid4().hex, refresh_token=f"{email}|{uuid.uuid4().hex}")
+        return SimpleNamespace(user=user, session=session)
+
+    def sign_up(self, credentials):
+        self.client.latency.sleep(self.client.rng)
+        return self._session(credentials['email'])
+
+    def sign_in_with_password(self, credentials):
+        self.client.latency.sleep(self.client.rng)
+        return self._session(credentials['email'])
+
+    def refresh_session(self, refresh_token):
+        self.client.latency.sleep(self.client.rng)
+        return self._session(refresh_token.split('|', 1)[0])
+
+    def get_session(self):
+        return None
+
+    def sign_out(self):
+        self.client.latency.sleep(self.client.rng)
+
+
+class FakeSupabase:
+    def __init__(self, db: FakeDatabase, latency: Latency, rng: random.Random):
+        self.db = db
+        self.latency = latency
+        self.rng = rng
+        self.auth = FakeAuth(self)
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+
+class FakeGemini:
+    """Returns a plan with the same Day 1..7 structure the real prompts ask for."""
+
+    def __init__(self, latency: Latency, rng: random.Random):
+        self.latency = latency
+        self.rng = rng
+        self.models = self
+
+    def generate_content(self, model: str, contents: str):
+        self.latency.sleep(self.rng)
+        days = "\n".join(
+            f"**Day {d}:**\n- **Breakfast:** Oats - 400 calories, 20g protein\n"
+            f"- **Daily Total:** 2000 calories, 120g protein\n"
+            for d in range(1, 8)
+        )
+        return SimpleNamespace(text=f"Here is your plan ({len(contents)} chars of prompt):\n\n{days}")
+
+
+@dataclass
+class ClientConfig:
+    url: str
+    seed: int
+    timeout: float
+    duration: float
+
+
+@dataclass
+class StageResult:
+    concurrency: int
+    duration: float
+    journeys: int = 0
+    errors: int = 0
+    step_latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    error_samples: List[str] = field(default_factory=list)
+    server_rss_mb: List[float] = field(default_factory=list)
+    server_threads: List[int] = field(default_factory=list)
+    speculation: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        return self.journeys / self.duration if self.duration else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        attempts = self.journeys + self.errors
+        return self.errors / attempts if attempts else 1.0
+
+    def failed(self, max_error_rate: float) -> bool:
+        """A stage with no completed journeys or too many errors measured the harness, not the app."""
+        return self.journeys == 0 or self.error_rate > max_error_rate
+
+    def app_latencies(self) -> List[float]:
+        """Step latencies excluding plan generation, which is dominated by mocked Gemini time."""
+        return [v for step, values in self.step_latencies.items() if step != 'generate' for v in values]
+
+    def merge(self, other: Dict[str, Any]) -> None:
+        self.journeys += other['journeys']
+        self.errors += other['errors']
+        for step, values in other['step_latencies'].items():
+            self.step_latencies[step].extend(values)
+        self.error_samples.extend(other['error_samples'][:max(0, 5 - len(self.error_samples))])
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+# Server process ---------------------------------------------------------------
+
+SERVER_FLAGS = {
+    'server_headless': True,
+    'server_address': '127.0.0.1',
+    'server_fileWatcherType': 'none',
+    'server_runOnSave': False,
+    'browser_gatherUsageStats': False,
+}
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Run app.py in a real Streamlit server with the Supabase and Gemini fakes installed.
+
+    This is the server process of a stage: every simulated browser shares its
+    event loop, script threads, thread pools and cache, as on a replica.
+    """
+    import streamlit
+    from streamlit.runtime.secrets import Secrets
+    from streamlit.web import bootstrap
+
+    secrets = Secrets()
+    # Set directly so no secrets.toml on disk is read or can override these
+    secrets._secrets = {
+        'SUPABASE_URL': 'http://loadtest.invalid',
+        'SUPABASE_ANON_KEY': 'loadtest',
+        'GEMINI_API_KEY': 'loadtest',
+        'CACHE_URL': args.cache_url,
+    }
+    streamlit.secrets = secrets
+
+    import gemini
+    import supabase_client
+
+    rng = random.Random(args.seed)
+    db = FakeDatabase()
+    db_latency = Latency(args.supabase_median, args.supabase_p95, args.time_scale)
+    gemini_latency = Latency(args.gemini_median, args.gemini_p95, args.time_scale)
+    supabase_client.create_client = lambda url, key: FakeSupabase(db, db_latency, rng)
+    gemini.get_client = lambda: FakeGemini(gemini_latency, rng)
+
+    flags = {**SERVER_FLAGS, 'server_port': args.port}
+    bootstrap.load_config_options(flags)
+    bootstrap.run(APP_PATH, False, [], flags)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class AppServer:
+    """A server process for app.py, started with the same options for every stage."""
+
+    def __init__(self, args: argparse.Namespace, cache_url: str, log_path: str):
+        self.port = _free_port()
+        self.log_path = log_path
+        cmd = [
+            sys.executable, os.path.abspath(__file__), '--serve',
+            '--port', str(self.port),
+            '--cache-url', cache_url,
+            '--seed', str(args.seed),
+            '--gemini-median', str(args.gemini_median),
+            '--gemini-p95', str(args.gemini_p95),
+            '--supabase-median', str(args.supabase_median),
+            '--supabase-p95', str(args.supabase_p95),
+            '--time-scale', str(args.time_scale),
+        ]
+        self.log = open(log_path, 'ab')
+        self.proc = subprocess.Popen(cmd, stdout=self.log, stderr=subprocess.STDOUT, cwd=os.path.dirname(APP_PATH))
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/_stcore/stream"
+
+    def wait_ready(self, timeout: float = 60) -> None:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"Server exited with code {self.proc.returncode}; see {self.log_path}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1) as res:
+                    if res.status == 200:
+                        return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"Server did not become healthy within {timeout:.0f}s; see {self.log_path}")
+
+    def usage(self) -> Optional[Tuple[float, int]]:
+        """Current (RSS in MB, thread count) of the server process, read from /proc (Linux only)."""
+        try:
+            with open(f"/proc/{self.proc.pid}/status") as fh:
+                status = dict(line.split(':', 1) for line in fh if ':' in line)
+            return int(status['VmRSS'].split()[0]) / 1024, int(status['Threads'])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def stop(self) -> None:
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        self.log.close()
+
+
+def _speculation_stats(cache_url: str) -> Dict[str, int]:
+    """Today's speculation counters as recorded by the server in the stage's cache."""
+    from cache import Namespace, RedisCache, SQLiteCache
+
+    parsed = urlparse(cache_url)
+    backend = SQLiteCache(parsed.path) if parsed.scheme == 'sqlite' else RedisCache(cache_url)
+    counters = Namespace(backend, 'speculation')
+    day = date.today().isoformat()
+    return {event: counters.get(f"stats:{day}:{event}") or 0 for event in SPECULATION_EVENTS}
+
+
+# Simulated browsers -----------------------------------------------------------
+
+WIDGET_TYPES = ('button', 'text_input', 'text_area')
+
+
+class BrowserSession:
+    """Minimal stand-in for the Streamlit frontend on one websocket.
+
+    Sends rerun requests carrying text widget values and a button trigger, as
+    the browser does, and keeps the widgets and exceptions rendered by the
+    latest completed script run.
+    """
+
+    def __init__(self, url: str, timeout: float):
+        self.url = url
+        self.timeout = timeout
+        self.ws = None
+        self.widgets: Dict[tuple, Tuple[str, str, str]] = {}
+        self.exceptions: List[str] = []
+        self.values: Dict[str, str] = {}
+
+    async def connect(self) -> None:
+        from tornado.websocket import websocket_connect
+
+        try:
+            self.ws = await asyncio.wait_for(
+                websocket_connect(self.url, subprotocols=['streamlit'], max_message_size=200 * 1024 * 1024),
+                self.timeout,
+            )
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Websocket did not connect within {self.timeout}s") from None
+
+    def close(self) -> None:
+        if self.ws is not None:
+            self.ws.close()
+
+    def find(self, kind: str, label: str) -> str:
+        for widget_kind, widget_label, widget_id in self.widgets.values():
+            if widget_kind == kind and widget_label.startswith(label):
+                return widget_id
+        raise LookupError(f"No {kind} labelled {label!r} in the last run")
+
+    def fill(self, kind: str, label: str, value: str) -> None:
+        self.values[self.find(kind, label)] = value
+
+    async def rerun(self, click: Optional[str] = None) -> None:
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        msg = BackMsg()
+        msg.rerun_script.widget_states.SetInParent()
+        live = {widget_id for _, _, widget_id in self.widgets.values()}
+        for widget_id, value in self.values.items():
+            if widget_id in live:
+                state = msg.rerun_script.widget_states.widgets.add()
+                state.id, state.string_value = widget_id, value
+        if click:
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id, state.trigger_value = self.find('button', click), True
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+        try:
+            await asyncio.wait_for(self._until_finished(), self.timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Script run did not finish within {self.timeout}s") from None
+        if self.exceptions:
+            raise RuntimeError(self.exceptions[0])
+
+    async def _until_finished(self) -> None:
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        while True:
+            raw = await self.ws.read_message()
+            if raw is None:
+                raise ConnectionError("Server closed the websocket")
+            msg = ForwardMsg()
+            msg.ParseFromString(raw)
+            kind = msg.WhichOneof('type')
+            if kind == 'new_session':
+                # Sent at the start of every script run
+                self.widgets, self.exceptions = {}, []
+            elif kind == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+                element = msg.delta.new_element
+                element_type = element.WhichOneof('type')
+                path = tuple(msg.metadata.delta_path)
+                if element_type == 'exception':
+                    self.exceptions.append(f"{element.exception.type}: {element.exception.message}")
+                elif element_type in WIDGET_TYPES:
+                    widget = getattr(element, element_type)
+                    self.widgets[path] = (element_type, widget.label, widget.id)
+                else:
+                    self.widgets.pop(path, None)
+            elif kind == 'script_finished':
+                if msg.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    # st.rerun(); the next run follows on its own
+                    continue
+                if msg.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("app.py failed to compile")
+                return
+
+
+class Journey:
+    """One simulated user returning to the app again and again from a fresh browser tab."""
+
+    def __init__(self, session_idx: int, cfg: ClientConfig):
+        self.rng = random.Random(cfg.seed * 100003 + session_idx)
+        self.email = f"loadtest-{session_idx}@example.com"
+        self.cfg = cfg
+        self.defaults_saved = False
+
+    async def _step(self, result: StageResult, name: str, session: BrowserSession, click: Optional[str] = None) -> None:
+        start = time.perf_counter()
+        await session.rerun(click)
+        result.step_latencies[name].append(time.perf_counter() - start)
+
+    async def run(self, result: StageResult) -> None:
+        session = BrowserSession(self.cfg.url, self.cfg.timeout)
+        await session.connect()
+        try:
+            await self._step(result, 'landing', session)
+            await self._step(result, 'open_auth', session, "🚀 Get Started")
+            session.fill('text_input', "Email Address", self.email)
+            session.fill('text_input', "Password", "loadtest-password")
+            await self._step(result, 'sign_in', session, "Sign In")
+
+            # Returning users mostly generate with their saved defaults, which
+            # sign-in has started pre-generating
+            if not self.defaults_saved or self.rng.random() < 0.3:
+                session.fill('text_area', "List the ingredients", ", ".join(self.rng.sample(INGREDIENTS, 5)))
+                session.fill('text_area', "List the exercise equipment", ", ".join(self.rng.sample(EQUIPMENT, 3)))
+            await self._step(result, 'generate', session, "🚀 Generate My Weekly Plan")
+
+            await self._step(result, 'history', session, "📊 History")
+            if self.rng.random() < 0.3:
+                await self._step(result, 'delete_plan', session, "🗑️ Delete")
+
+            await self._step(result, 'profile', session, "⚙️ Profile & Settings")
+            if not self.defaults_saved:
+                session.fill('text_area', "Default Pantry Ingredients", ", ".join(self.rng.sample(INGREDIENTS, 5)))
+                session.fill('text_area', "Default Exercise Equipment", ", ".join(self.rng.sample(EQUIPMENT, 3)))
+            await self._step(result, 'save_profile', session, "💾 Save Changes")
+            self.defaults_saved = True
+        finally:
+            session.close()
+
+
+def _client_worker(session_ids: List[int], cfg: ClientConfig, ready, go, started_at, results) -> None:
+    """Drive a group of simulated browsers from one process until the stage deadline."""
+    import streamlit.proto.BackMsg_pb2  # noqa: F401 - import before the clock starts
+    import streamlit.proto.ForwardMsg_pb2  # noqa: F401
+    import tornado.websocket  # noqa: F401
+
+    result = StageResult(concurrency=len(session_ids), duration=cfg.duration)
+
+    async def loop_session(idx: int, deadline: float) -> None:
+        journey = Journey(idx, cfg)
+        while time.time() < deadline:
+            try:
+                await journey.run(result)
+                result.journeys += 1
+            except Exception as e:
+                result.errors += 1
+                if len(result.error_samples) < 3:
+                    result.error_samples.append(f"{type(e).__name__}: {e}")
+
+    async def drive(deadline: float) -> None:
+        await asyncio.gather(*(loop_session(idx, deadline) for idx in session_ids))
+
+    try:
+        ready.wait(timeout=120)
+    except threading.BrokenBarrierError:
+        return
+    go.wait()
+    asyncio.run(drive(started_at.value + cfg.duration))
+    results.put({
+        'journeys': result.journeys,
+        'errors': result.errors,
+        'step_latencies': dict(result.step_latencies),
+        'error_samples': result.error_samples,
+    })
+
+
+async def _warm_up(url: str, timeout: float) -> None:
+    """Render the landing page once so app imports are not billed to the first sessions."""
+    session = BrowserSession(url, timeout)
+    await session.connect()
+    try:
+        await session.rerun()
+    finally:
+        session.close()
+
+
+# Stages -----------------------------------------------------------------------
+
+def run_stage(concurrency: int, args: argparse.Namespace, workdir: str) -> StageResult:
+    """Start a fresh server and drive `concurrency` simulated browsers at it for args.duration seconds."""
+    cache_url = args.cache_url or f"sqlite:///{os.path.join(workdir, f'cache-{concurrency}.sqlite3')}"
+    server = AppServer(args, cache_url, os.path.join(workdir, f'server-{concurrency}.log'))
+    result = StageResult(concurrency=concurrency, duration=args.duration)
+    try:
+        server.wait_ready()
+        # Not timed; a failure here fails the stage like any other error
+        asyncio.run(_warm_up(server.url, args.timeout))
+        speculation_before = _speculation_stats(cache_url)
+
+        cfg = ClientConfig(url=server.url, seed=args.seed, timeout=args.timeout, duration=args.duration)
+        ctx = multiprocessing.get_context('spawn')
+        procs = max(1, min(args.client_procs, concurrency))
+        ready = ctx.Barrier(procs + 1)
+        go = ctx.Event()
+        started_at = ctx.Value('d', 0.0)
+        results = ctx.Queue()
+        clients = [
+            ctx.Process(target=_client_worker, args=(list(range(i, concurrency, procs)), cfg, ready, go, started_at, results),
+                        daemon=True)
+            for i in range(procs)
+        ]
+        for client in clients:
+            client.start()
+        # Wait until every client process is ready so process start-up is not timed
+        try:
+            ready.wait(timeout=120)
+        except threading.BrokenBarrierError:
+            raise RuntimeError("Client processes did not start") from None
+        started_at.value = time.time()
+        go.set()
+
+        collected = 0
+        wait_until = time.time() + args.duration + args.timeout * 10
+        next_sample = 0.0
+        while collected < procs and time.time() < wait_until:
+            if time.time() >= next_sample:
+                usage = server.usage()
+                if usage:
+                    result.server_rss_mb.append(usage[0])
+                    result.server_threads.append(usage[1])
+                next_sample = time.time() + 0.5
+            try:
+                result.merge(results.get(timeout=0.5))
+                collected += 1
+            except queue.Empty:
+                if not any(client.is_alive() for client in clients):
+                    break
+        # Journeys still in flight at the deadline finish, so use the real elapsed time
+        result.duration = time.time() - started_at.value
+        for client in clients:
+            client.join(timeout=5)
+            if client.is_alive():
+                client.terminate()
+        missing = procs - collected
+        if missing:
+            result.errors += missing
+            result.error_samples.append(f"{missing} client process(es) exited without reporting")
+        if server.proc.poll() is not None:
+            result.error_samples.append(f"Server exited with code {server.proc.returncode}; see {server.log_path}")
+
+        speculation_after = _speculation_stats(cache_url)
+        result.speculation = {k: speculation_after[k] - speculation_before[k] for k in SPECULATION_EVENTS}
+    except Exception as e:
+        result.errors += 1
+        result.error_samples.append(f"{type(e).__name__}: {e}")
+    finally:
+        server.stop()
+    return result
+
+
+def find_saturation(results: List[StageResult], p95_budget: float, max_error_rate: float,
+                    min_gain: float = 0.1) -> Optional[StageResult]:
+    """Return the first healthy stage where throughput stopped scaling or p95 blew the budget.
+
+    Only stages before the first failed stage are considered, since a failed
+    stage says nothing about the app's capacity.
+    """
+    healthy: List[StageResult] = []
+    for r in results:
+        if r.failed(max_error_rate):
+            break
+        healthy.append(r)
+    for prev, cur in zip(healthy, healthy[1:]):
+        gain = (cur.throughput - prev.throughput) / prev.throughput
+        if gain < min_gain or _percentile(cur.app_latencies(), 95) > p95_budget:
+            return cur
+    return None
+
+
+def print_report(results: List[StageResult], p95_budget: float, max_error_rate: float) -> None:
+    print()
+    print(f"{'sessions':>8} {'journeys/s':>10} {'errors':>6} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} "
+          f"{'gen p95 s':>9} {'spec hits':>9} {'threads':>7} {'rss MB':>13}")
+    for r in results:
+        lat = r.app_latencies()
+        lookups = r.speculation.get('hit', 0) + r.speculation.get('miss', 0)
+        hits = f"{r.speculation.get('hit', 0)}/{lookups}"
+        threads = max(r.server_threads) if r.server_threads else 0
+        rss = f"{r.server_rss_mb[0]:.0f}->{max(r.server_rss_mb):.0f}" if r.server_rss_mb else "n/a"
+        print(f"{r.concurrency:>8} {r.throughput:>10.2f} {r.errors:>6} {_percentile(lat, 50):>7.3f} "
+              f"{_percentile(lat, 95):>7.3f} {_percentile(lat, 99):>7.3f} "
+              f"{_percentile(r.step_latencies.get('generate', []), 95):>9.3f} {hits:>9} "
+              f"{threads:>7} {rss:>13}")
+    print("(p50/p95/p99 exclude the generate step; spec hits = Generate clicks served from a "
+          "pre-generated plan; threads and RSS are the server process, RSS from start of load to peak)")
+
+    healthy = [r for r in results if not r.failed(max_error_rate)]
+    if healthy:
+        top = healthy[-1]
+        print("\nPer-step latency at the highest healthy load (s):")
+        for step, values in top.step_latencies.items():
+            print(f"  {step:<14} n={len(values):<6} p50={_percentile(values, 50):.3f} "
+                  f"p95={_percentile(values, 95):.3f} p99={_percentile(values, 99):.3f} "
+                  f"mean={statistics.fmean(values):.3f}")
+        print(f"  speculation: {top.speculation}")
+
+    failed = next((r for r in results if r.failed(max_error_rate)), None)
+    if failed:
+        print(f"\nRun FAILED at {failed.concurrency} sessions: {failed.journeys} journeys, "
+              f"{failed.errors} errors ({failed.error_rate:.0%}). This is not a saturation point.")
+        for sample in failed.error_samples:
+            print(f"  {sample}")
+
+    saturation = find_saturation(results, p95_budget, max_error_rate)
+    if saturation:
+        print(f"\nSaturation point: ~{saturation.concurrency} concurrent sessions "
+              f"({saturation.throughput:.2f} journeys/s, non-generate p95 {_percentile(saturation.app_latencies(), 95):.3f}s)")
+    elif healthy:
+        print(f"\nNo saturation up to {healthy[-1].concurrency} concurrent sessions (p95 budget {p95_budget}s)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--levels', default='10,25,50,100,200', help='Comma-separated concurrency levels')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds per stage')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--gemini-median', type=float, default=8.0)
+    parser.add_argument('--gemini-p95', type=float, default=20.0)
+    parser.add_argument('--supabase-median', type=float, default=0.08)
+    parser.add_argument('--supabase-p95', type=float, default=0.3)
+    parser.add_argument('--time-scale', type=float, default=1.0, help='Multiply all mocked latencies (e.g. 0.05 for a quick run)')
+    parser.add_argument('--p95-budget', type=float, default=2.0, help='Non-generate step p95 (s) treated as saturated')
+    parser.add_argument('--max-error-rate', type=float, default=0.05, help='Error rate above which a stage counts as a failed run')
+    parser.add_argument('--timeout', type=float, default=120, help='Per-rerun timeout in seconds')
+    parser.add_argument('--cache-url', help='Shared cache for the server, e.g. redis://localhost:6379/15 '
+                                            '(default: a fresh SQLite file per stage)')
+    parser.add_argument('--client-procs', type=int, default=max(1, min(4, (os.cpu_count() or 2) // 2)),
+                        help='Processes driving the simulated browsers')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args)
+        return 0
+
+    levels = [int(level) for level in args.levels.split(',') if level.strip()]
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    results = []
+    for level in levels:
+        print(f"Running {level} concurrent sessions for {args.duration:.0f}s...", flush=True)
+        results.append(run_stage(level, args, workdir))
+    print_report(results, args.p95_budget, args.max_error_rate)
+    failed = any(r.failed(args.max_error_rate) for r in results)
+    if failed:
+        print(f"\nServer logs kept in {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,82 @@
 import streamlit as st
 from datetime import datetime
-from auth import delete_plan
+from auth import clear_plan_history, delete_plan, is_admin, update_plan_content
+from export import EXPORT_FORMATS, create_export_link
+from gemini import MEALS, regenerate_exercise_day, regenerate_meal_day, replace_plan_day, split_plan_days
+
+def show_regenerate_controls(plan):
+    """Let the user regenerate one day (or one meal) of a stored plan."""
+    days = [d for d, _ in split_plan_days(plan['content']) if d is not None]
+    pid = plan.get('id')
+    if not days or not pid:
+        return
+    
+    with st.popover("🔄 Regenerate a day", use_container_width=True):
+        day = st.selectbox("Day:", days, format_func=lambda d: f"Day {d}", key=f"regen_day_{pid}")
+        meal = None
+        if plan['type'] == 'meal':
+            choice = st.selectbox("What to replace:", ["Whole day"] + MEALS, key=f"regen_meal_{pid}")
+            meal = None if choice == "Whole day" else choice
+        feedback = st.text_input(
+            "What should change? (optional)",
+            placeholder="e.g., no fish, shorter workout...",
+            key=f"regen_feedback_{pid}"
+        )
+        
+        if st.button("Regenerate", type="primary", key=f"regen_{pid}", use_container_width=True):
+            user_data = st.session_state.user_data
+            with st.spinner(f"🤖 Regenerating Day {day}..."):
+                try:
+                    if plan['type'] == 'meal':
+                        segment = regenerate_meal_day(
+                            goal=plan['goal'],
+                            plan_content=plan['content'],
+                            day=day,
+                            meal=meal,
+                            feedback=feedback,
+                            dietary_preferences=user_data.get('dietary_preferences', '')
+                        )
+                    else:
+                        segment = regenerate_exercise_day(
+                            goal=plan['goal'],
+                            plan_content=plan['content'],
+                            day=day,
+                            fitness_level=user_data.get('fitness_level', 'Intermediate').lower(),
+                            feedback=feedback
+                        )
+                    update_plan_content(pid, replace_plan_day(plan['content'], day, segment))
+                except Exception as e:
+                    st.error(f"Error regenerating Day {day}: {e}")
+                    return
+            st.session_state.regenerated_plan = pid
+            st.rerun()
+
+def _show_export_download(fmt: str, all_users: bool = False):
+    """Offer a single-use link that streams the export straight from Supabase."""
+    link = create_export_link(fmt, st.session_state.user_id, all_users=all_users)
+    st.link_button(f"⬇️ Download {fmt} export", link, type="primary", use_container_width=True)
+    st.caption("The link works once and expires in 5 minutes. Large exports start downloading right away.")
+
+def show_export_section():
+    """Let users export their full plan history, and admins every user's."""
+    st.subheader("📦 Export Plans")
+    st.caption("Exports include your full history, not just the plans shown above.")
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        fmt = st.selectbox("Format:", list(EXPORT_FORMATS.keys()), key="export_format")
+        scope = "My plans"
+        if is_admin():
+            scope = st.radio("Scope:", ["My plans", "All users (admin)"], horizontal=True, key="export_scope")
+    with col2:
+        st.markdown("<br>", unsafe_allow_html=True)
+        prepare = st.button("Prepare Export", use_container_width=True)
+    
+    if prepare:
+        try:
+            _show_export_download(fmt, all_users=scope == "All users (admin)")
+        except Exception as e:
+            st.error(f"Export failed: {e}")
 
 def show_history_page():
     """Display user's plan history."""
@@ -36,10 +112,16 @@ def show_history_page():
         plan_icon = "🍽️" if plan['type'] == 'meal' else "💪"
         plan_type_name = "Meal Plan" if plan['type'] == 'meal' else "Exercise Plan"
         
-        with st.expander(f"{plan_icon} {plan_type_name} - {plan['goal']} ({created_date})", expanded=(idx == 0)):
+        just_regenerated = st.session_state.get('regenerated_plan') == plan.get('id')
+        with st.expander(f"{plan_icon} {plan_type_name} - {plan['goal']} ({created_date})", expanded=(idx == 0 or just_regenerated)):
+            if just_regenerated:
+                st.success("✅ Day regenerated! The rest of the week was kept as is.")
+                st.session_state.regenerated_plan = None
             st.markdown(plan['content'])
             
             col1, col2 = st.columns([3, 1])
+            with col1:
+                show_regenerate_controls(plan)
             with col2:
                 if st.button(f"🗑️ Delete", key=f"delete_{plan.get('id', idx)}"):
                     pid = plan.get('id')
@@ -50,13 +132,14 @@ def show_history_page():
     
     st.markdown("---")
     
+    show_export_section()
+    
+    st.markdown("---")
+    
     if st.button("🗑️ Clear All History", type="secondary"):
         if st.session_state.get('confirm_clear', False):
             # Bulk delete all user's plans
-            from supabase_client import get_supabase
-            if st.session_state.get('user_id'):
-                get_supabase().table('plans').delete().eq('user_id', st.session_state.user_id).execute()
-                st.session_state.plan_history = []
+            clear_plan_history()
             st.session_state.confirm_clear = False
             st.success("All history cleared!")
             st.rerun()
@@ -1,6 +1,6 @@
 import streamlit as st
-from gemini import generate_meal_plan, generate_exercise_plan
 from auth import add_plan_to_history
+from speculation import generate
 
 def show_planner_page():
     """Display the meal and exercise planner page."""
@@ -38,12 +38,14 @@ def show_planner_page():
         ingredients = st.text_area(
             "List the ingredients you have available:",
             placeholder="e.g., chicken breast, rice, eggs, spinach, oats, bananas, almonds, olive oil, sweet potatoes, broccoli, salmon, quinoa, Greek yogurt, berries...",
+            value=st.session_state.user_data.get('default_ingredients') or '',
             height=150,
             help="Enter ingredients separated by commas or on new lines"
         )
         
         dietary_preferences = st.text_input(
             "Dietary preferences or restrictions (optional):",
+            value=st.session_state.user_data.get('dietary_preferences') or '',
             placeholder="e.g., vegetarian, no dairy, low carb...",
             help="Any dietary restrictions or preferences"
         )
@@ -53,6 +55,7 @@ def show_planner_page():
         equipment = st.text_area(
             "List the exercise equipment you have at home:",
             placeholder="e.g., dumbbells, resistance bands, yoga mat, pull-up bar, kettlebell, treadmill, bench...",
+            value=st.session_state.user_data.get('default_equipment') or '',
             height=150,
             help="Enter equipment separated by commas or on new lines. Include 'bodyweight' if you have no equipment."
         )
@@ -70,7 +73,9 @@ def show_planner_page():
                 
                 with tab1:
                     st.subheader(f"Your Weekly Meal Plan for {goal}")
-                    meal_plan = generate_meal_plan(
+                    meal_plan = generate(
+                        st.session_state.user_id,
+                        'meal',
                         goal=goal,
                         ingredients=ingredients,
                         dietary_preferences=dietary_preferences
@@ -81,7 +86,9 @@ def show_planner_page():
                 
                 with tab2:
                     st.subheader(f"Your Weekly Exercise Plan for {goal}")
-                    exercise_plan = generate_exercise_plan(
+                    exercise_plan = generate(
+                        st.session_state.user_id,
+                        'exercise',
                         goal=goal,
                         equipment=equipment,
                         fitness_level=fitness_level.lower()
@@ -1,5 +1,6 @@
 import streamlit as st
 from auth import update_user_data, sign_out
+from stats import ROLLUP_PERIODS, nutrition_trend, plan_counts, plan_rollups, plans_per_goal
 
 def show_profile_page():
     """Display user profile and settings page."""
@@ -88,16 +89,52 @@ def show_profile_page():
     
     st.subheader("📊 Statistics")
     
+    try:
+        counts = plan_counts(st.session_state.user_id)
+    except Exception as e:
+        st.error(f"Could not load statistics: {e}")
+        return
+    
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        total_plans = len(st.session_state.plan_history)
-        st.metric("Total Plans", total_plans)
+        st.metric("Total Plans", counts['total'])
     
     with col2:
-        meal_plans = len([p for p in st.session_state.plan_history if p['type'] == 'meal'])
-        st.metric("Meal Plans", meal_plans)
+        st.metric("Meal Plans", counts['meal'])
     
     with col3:
-        exercise_plans = len([p for p in st.session_state.plan_history if p['type'] == 'exercise'])
-        st.metric("Exercise Plans", exercise_plans)
+        st.metric("Exercise Plans", counts['exercise'])
+    
+    if not counts['total']:
+        return
+    
+    st.markdown("---")
+    
+    st.subheader("📈 Progress")
+    
+    period = st.radio("Group by:", ["Week", "Day"], horizontal=True, key="rollup_period")
+    try:
+        rows = plan_rollups(st.session_state.user_id, period.lower())
+    except Exception as e:
+        st.error(f"Could not load progress: {e}")
+        return
+    
+    per_goal = plans_per_goal(rows)
+    if not per_goal:
+        st.info(f"No plans in the last {ROLLUP_PERIODS[period.lower()]} {period.lower()}s.")
+        return
+    
+    st.markdown("**Plans per goal**")
+    goals = sorted({g for row in per_goal for g in row if g != 'Period'})
+    st.bar_chart(per_goal, x='Period', y=goals)
+    
+    trend = nutrition_trend(rows)
+    if trend:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("**Average daily calories**")
+            st.line_chart(trend, x='Period', y='Calories')
+        with col2:
+            st.markdown("**Average daily protein (g)**")
+            st.line_chart(trend, x='Period', y='Protein (g)')
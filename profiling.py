@@ -0,0 +1,189 @@
+import cProfile
+import getpass
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+import streamlit as st
+
+SAMPLE_INTERVAL = 0.005
+TOP_ALLOCATIONS = 25
+# Per-user directory: report file names carry user IDs and the stacks carry app internals
+DEFAULT_PROFILE_DIR = os.path.join(tempfile.gettempdir(), f"meal_planner_profiles-{getpass.getuser()}")
+
+# tracemalloc is process-wide, so keep it running while any session is profiling
+_tracing_lock = threading.Lock()
+_tracing_sessions = 0
+
+
+def _profile_dir() -> str:
+    """Directory for profiling output, from PROFILE_DIR in secrets/env or a private temp dir."""
+    if hasattr(st, "secrets") and "PROFILE_DIR" in st.secrets:
+        path = st.secrets["PROFILE_DIR"]
+    else:
+        path = os.environ.get("PROFILE_DIR") or DEFAULT_PROFILE_DIR
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if os.path.abspath(path) == DEFAULT_PROFILE_DIR:
+        info = os.lstat(path)
+        if not os.path.isdir(path) or os.path.islink(path) or (
+                hasattr(os, 'getuid') and info.st_uid != os.getuid()):
+            raise RuntimeError(f"Refusing to use profile directory not owned by this user: {path}")
+        os.chmod(path, 0o700)
+    return path
+
+
+def _open_private(path: str, mode: str = 'w'):
+    """Open a new report file readable only by this user."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    return os.fdopen(fd, mode)
+
+
+def enable_profiling(reruns: int) -> None:
+    """Profile the page dispatch for the next `reruns` reruns of this session."""
+    st.session_state._profile_reruns_left = max(0, int(reruns))
+
+
+def run_page(page_fn: Callable[[], Any]) -> Any:
+    """Call a show_* page function, profiling it only while profiling is enabled.
+
+    When disabled this is a single session-state lookup on top of the call.
+    """
+    if not st.session_state.get('_profile_reruns_left'):
+        return page_fn()
+    st.session_state._profile_reruns_left -= 1
+    return _profiled(page_fn)
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        super().__init__(daemon=True, name='stack-sampler')
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _start_tracing() -> None:
+    global _tracing_sessions
+    with _tracing_lock:
+        if _tracing_sessions == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        _tracing_sessions += 1
+
+
+def _stop_tracing() -> None:
+    global _tracing_sessions
+    with _tracing_lock:
+        _tracing_sessions -= 1
+        if _tracing_sessions == 0:
+            tracemalloc.stop()
+
+
+def _profiled(page_fn: Callable[[], Any]) -> Any:
+    sampler = _StackSampler(threading.get_ident())
+    profiler = cProfile.Profile()
+    _start_tracing()
+    try:
+        baseline = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        sampler.start()
+        # Raises on Python 3.12+ while another session's profiler is active
+        profiler.enable()
+    except Exception as e:
+        if sampler.is_alive():
+            sampler.stop()
+        _stop_tracing()
+        st.warning(f"Profiling skipped for this rerun: {e}")
+        return page_fn()
+
+    start = time.perf_counter()
+    try:
+        # st.rerun() and st.stop() raise through here; the report is still written
+        return page_fn()
+    finally:
+        profiler.disable()
+        sampler.stop()
+        elapsed = time.perf_counter() - start
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            _stop_tracing()
+        # A failed write must not replace the page's result or a pending rerun/stop
+        try:
+            _write_report(page_fn.__name__, profiler, sampler, baseline, snapshot, peak, elapsed)
+        except Exception as e:
+            st.warning(f"Could not write profile report: {e}")
+
+
+def _write_report(page_name: str, profiler: cProfile.Profile, sampler: _StackSampler,
+                  baseline: tracemalloc.Snapshot, snapshot: tracemalloc.Snapshot,
+                  peak: int, elapsed: float) -> None:
+    user = st.session_state.get('user_id') or 'anonymous'
+    stem = os.path.join(_profile_dir(), f"{user}-{page_name}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}")
+
+    # Same format as Profile.dump_stats, which would create the file with the default umask
+    profiler.create_stats()
+    with _open_private(f"{stem}.prof", 'wb') as fh:
+        marshal.dump(profiler.stats, fh)
+
+    with _open_private(f"{stem}.collapsed") as fh:
+        for stack, count in sampler.stacks.most_common():
+            fh.write(f"{stack} {count}\n")
+
+    # Exclude the profiler's own bookkeeping from the allocation summary
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, __file__),
+    ]
+    diff = snapshot.filter_traces(filters).compare_to(baseline.filter_traces(filters), 'lineno')
+    with _open_private(f"{stem}-alloc.txt") as fh:
+        fh.write(f"page: {page_name}\nwall time: {elapsed * 1000:.1f} ms\n")
+        fh.write(f"peak traced memory: {peak / 1024:.1f} KiB\n")
+        fh.write(f"stack samples: {sum(sampler.stacks.values())} @ {SAMPLE_INTERVAL * 1000:.0f} ms\n\n")
+        fh.write(f"Top {TOP_ALLOCATIONS} allocation sites (net change during rerun):\n")
+        for stat in diff[:TOP_ALLOCATIONS]:
+            fh.write(f"{stat}\n")
+
+    reports: List[Dict[str, Any]] = st.session_state.setdefault('_profile_reports', [])
+    reports.insert(0, {'page': page_name, 'elapsed': elapsed, 'stem': stem})
+    del reports[10:]
+
+
+def show_profiling_controls() -> None:
+    """Sidebar controls for admins to profile upcoming reruns of their session."""
+    with st.expander("🔬 Profiling"):
+        reruns = st.number_input("Reruns to profile", min_value=1, max_value=50, value=5, key="profile_reruns")
+        if st.button("Start Profiling", use_container_width=True):
+            enable_profiling(reruns)
+            st.rerun()
+        remaining = st.session_state.get('_profile_reruns_left', 0)
+        if remaining:
+            st.caption(f"Profiling the next {remaining} rerun(s)")
+        for report in st.session_state.get('_profile_reports', []):
+            st.caption(f"{report['page']} - {report['elapsed'] * 1000:.0f} ms")
+            st.code(f"{report['stem']}.prof\n{report['stem']}.collapsed\n{report['stem']}-alloc.txt", language=None)
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, Optional
+import streamlit as st
+from cache import namespace
+from gemini import generate_exercise_plan, generate_meal_plan
+
+GENERATORS: Dict[str, Callable[..., str]] = {
+    'meal': generate_meal_plan,
+    'exercise': generate_exercise_plan,
+}
+SPECULATION_TTL = 24 * 60 * 60
+COUNTER_TTL = 8 * 24 * 60 * 60
+
+
+def _setting(name: str, default: int) -> int:
+    # Read at import, so a missing secrets.toml falls back to the environment instead of raising
+    try:
+        if hasattr(st, "secrets") and name in st.secrets:
+            return int(st.secrets[name])
+    except FileNotFoundError:
+        pass
+    return int(os.environ.get(name, default))
+
+
+# Global cap on background Gemini calls per process; extra requests are dropped, not queued
+MAX_CONCURRENCY = _setting("SPECULATION_MAX_CONCURRENCY", 4)
+# Speculative generations allowed per user per day
+DAILY_BUDGET = _setting("SPECULATION_DAILY_BUDGET", 4)
+
+_executor = ThreadPoolExecutor(max_workers=max(1, MAX_CONCURRENCY), thread_name_prefix='speculate')
+_slots = threading.BoundedSemaphore(max(1, MAX_CONCURRENCY))
+# Keyed like the stored results, so users never wait on each other's speculation
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _speculations():
+    return namespace('speculation', ttl=SPECULATION_TTL)
+
+
+def _key(kind: str, kwargs: Dict[str, Any]) -> str:
+    payload = json.dumps([kind, kwargs], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _count(event: str) -> None:
+    _speculations().incr(f"stats:{date.today().isoformat()}:{event}", ttl=COUNTER_TTL)
+
+
+def default_requests(user_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """The generate arguments the planner page uses when a profile's defaults are left unchanged."""
+    goal = user_data.get('fitness_goal', 'Maintenance')
+    requests: Dict[str, Dict[str, Any]] = {}
+    if (user_data.get('default_ingredients') or '').strip():
+        requests['meal'] = {
+            'goal': goal,
+            'ingredients': user_data['default_ingredients'],
+            'dietary_preferences': user_data.get('dietary_preferences') or '',
+        }
+    if (user_data.get('default_equipment') or '').strip():
+        requests['exercise'] = {
+            'goal': goal,
+            'equipment': user_data['default_equipment'],
+            'fitness_level': (user_data.get('fitness_level') or 'Intermediate').lower(),
+        }
+    return requests
+
+
+def _result_key(user_id: str, key: str) -> str:
+    return f"result:{user_id}:{key}"
+
+
+def _take_result(user_id: str, key: str) -> Optional[str]:
+    """Remove and return an unserved speculative plan, so each one is served at most once."""
+    cache = _speculations()
+    result = cache.get(_result_key(user_id, key))
+    if result:
+        cache.delete(_result_key(user_id, key))
+    return result
+
+
+def _run(key: str, user_id: str, kind: str, kwargs: Dict[str, Any]) -> str:
+    try:
+        result = GENERATORS[kind](**kwargs)
+        if not result.startswith(("Error generating", "Unable to generate")):
+            # Stored in the shared tier so the user's next request can be served by any replica
+            _speculations().set(_result_key(user_id, key), result)
+        return result
+    finally:
+        with _inflight_lock:
+            _inflight.pop(_result_key(user_id, key), None)
+        _slots.release()
+
+
+def speculate_defaults(user_id: str, user_data: Dict[str, Any]) -> None:
+    """Start generating the profile's default meal/exercise plans in the background.
+
+    Each result is kept in the shared cache until the user's next Generate with
+    the same inputs, which returns it without calling the model. Skips anything
+    already speculated and unserved, in flight, over the user's daily budget or
+    beyond the global concurrency cap.
+    """
+    cache = _speculations()
+    for kind, kwargs in default_requests(user_data).items():
+        key = _key(kind, kwargs)
+        with _inflight_lock:
+            if _result_key(user_id, key) in _inflight or cache.get(_result_key(user_id, key)):
+                continue
+        if not _slots.acquire(blocking=False):
+            _count('over_capacity')
+            return
+        spent = cache.incr(f"budget:{user_id}:{date.today().isoformat()}", ttl=COUNTER_TTL)
+        if spent is None or spent > DAILY_BUDGET:
+            _slots.release()
+            _count('over_budget')
+            return
+        with _inflight_lock:
+            _inflight[_result_key(user_id, key)] = _executor.submit(_run, key, user_id, kind, kwargs)
+        _count('started')
+
+
+def generate(user_id: Optional[str], kind: str, **kwargs: Any) -> str:
+    """Generate a plan, serving an unserved speculative pre-generation when the inputs match.
+
+    A speculative plan is handed out once; clicking Generate again with the
+    same inputs calls the model for a new plan.
+    """
+    key = _key(kind, kwargs)
+    with _inflight_lock:
+        future = _inflight.get(_result_key(user_id, key)) if user_id else None
+    if future is not None:
+        try:
+            future.result()
+        except Exception:
+            pass
+    result = _take_result(user_id, key) if user_id else None
+    _count('hit' if result else 'miss')
+    return result or GENERATORS[kind](**kwargs)
+
+
+def speculation_stats(day: Optional[str] = None) -> Dict[str, int]:
+    """Per-day speculation counters across all replicas sharing the cache."""
+    day = day or date.today().isoformat()
+    cache = _speculations()
+    return {
+        event: cache.get(f"stats:{day}:{event}") or 0
+        for event in ('started', 'hit', 'miss', 'over_budget', 'over_capacity')
+    }
+
+
+def show_speculation_stats() -> None:
+    """Sidebar summary of today's speculation hit rate for admins."""
+    with st.expander("⚡ Pre-generation"):
+        stats = speculation_stats()
+        lookups = stats['hit'] + stats['miss']
+        st.metric("Hit rate today", f"{stats['hit'] / lookups:.0%}" if lookups else "n/a")
+        st.caption(
+            f"{stats['hit']} hits / {stats['miss']} misses · {stats['started']} started · "
+            f"{stats['over_budget']} over budget · {stats['over_capacity']} over capacity"
+        )
+        st.caption(f"Budget {DAILY_BUDGET}/user/day · {MAX_CONCURRENCY} concurrent")
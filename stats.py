@@ -0,0 +1,117 @@
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from cache import namespace, register_invalidation
+from supabase_client import get_supabase
+
+STATS_CACHE_TTL = 10 * 60
+ROLLUP_PERIODS = {'day': 30, 'week': 12}
+
+DAILY_TOTAL = re.compile(
+    r'Daily Total:?\**\s*:?\s*~?([\d,]+(?:\.\d+)?)\s*(?:k?cal\w*)[^\n]*?([\d.]+)\s*g\s*(?:of\s+)?protein',
+    re.IGNORECASE,
+)
+
+
+def _stats_cache():
+    return namespace('stats', ttl=STATS_CACHE_TTL)
+
+
+def _invalidate_stats(user_id: str) -> None:
+    cache = _stats_cache()
+    cache.delete(f"counts:{user_id}")
+    for period in ROLLUP_PERIODS:
+        cache.delete(f"rollups:{period}:{user_id}")
+
+
+register_invalidation('plans', _invalidate_stats)
+
+
+def parse_nutrition(content: str) -> Tuple[Optional[float], Optional[float]]:
+    """Average the "Daily Total" calories and protein across a meal plan's days."""
+    totals = [
+        (float(cal.replace(',', '')), float(protein))
+        for cal, protein in DAILY_TOTAL.findall(content or '')
+    ]
+    if not totals:
+        return None, None
+    return (
+        round(sum(c for c, _ in totals) / len(totals), 1),
+        round(sum(p for _, p in totals) / len(totals), 1),
+    )
+
+
+def _count(user_id: str, plan_type: Optional[str] = None) -> int:
+    query = get_supabase().table('plans').select('id', count='exact', head=True).eq('user_id', user_id)
+    if plan_type:
+        query = query.eq('type', plan_type)
+    res = query.execute()
+    return getattr(res, 'count', None) or 0
+
+
+def plan_counts(user_id: str) -> Dict[str, int]:
+    """Exact plan counts for a user, from server-side count queries."""
+    cache = _stats_cache()
+    key = f"counts:{user_id}"
+    cached = cache.get(key)
+    if cached:
+        return cached
+    counts = {
+        'total': _count(user_id),
+        'meal': _count(user_id, 'meal'),
+        'exercise': _count(user_id, 'exercise'),
+    }
+    cache.set(key, counts)
+    return counts
+
+
+def plan_rollups(user_id: str, period: str = 'week') -> List[Dict[str, Any]]:
+    """Pre-aggregated rollup rows for the most recent periods, oldest first.
+
+    Reads at most ROLLUP_PERIODS[period] buckets per type and goal, so the
+    query cost does not grow with the size of the user's history.
+    """
+    cache = _stats_cache()
+    key = f"rollups:{period}:{user_id}"
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    days = ROLLUP_PERIODS[period] * (7 if period == 'week' else 1)
+    since = (date.today() - timedelta(days=days)).isoformat()
+    res = (
+        get_supabase().table('plan_rollups')
+        .select('period_start,type,goal,plan_count,calories_sum,protein_sum,nutrition_count')
+        .eq('user_id', user_id)
+        .eq('period', period)
+        .gte('period_start', since)
+        .order('period_start')
+        .execute()
+    )
+    rows = getattr(res, 'data', None) or []
+    cache.set(key, rows)
+    return rows
+
+
+def plans_per_goal(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Pivot rollup rows into one chart row per period with a column per goal."""
+    pivot: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        bucket = pivot.setdefault(row['period_start'], {'Period': row['period_start']})
+        bucket[row['goal']] = bucket.get(row['goal'], 0) + row['plan_count']
+    return list(pivot.values())
+
+
+def nutrition_trend(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Average daily calories and protein per period across meal plans that reported them."""
+    sums: Dict[str, List[float]] = {}
+    for row in rows:
+        if row['type'] != 'meal' or not row['nutrition_count']:
+            continue
+        acc = sums.setdefault(row['period_start'], [0.0, 0.0, 0])
+        acc[0] += float(row['calories_sum'])
+        acc[1] += float(row['protein_sum'])
+        acc[2] += row['nutrition_count']
+    return [
+        {'Period': period, 'Calories': round(cal / n), 'Protein (g)': round(protein / n)}
+        for period, (cal, protein, n) in sums.items()
+    ]
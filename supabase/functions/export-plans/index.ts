@@ -0,0 +1,161 @@
+// Streams a plan history export as JSONL, CSV or a printable HTML document.
+//
+// GET /functions/v1/export-plans?ticket=<uuid>
+//
+// The ticket is minted by the app (see export.py) and consumed here on first
+// use. Plans are paged with a keyset cursor on (created_at, id) and written
+// to the response as the client reads it, so memory stays at one page no
+// matter how large the export is. Deploy with --no-verify-jwt: the browser
+// follows a plain link, and the ticket is the credential.
+
+import { createClient, SupabaseClient } from "npm:@supabase/supabase-js@2";
+
+const EXPORT_COLUMNS = ["id", "user_id", "type", "goal", "created_at", "content"];
+const CONTENT_TYPES: Record<string, string> = {
+  jsonl: "application/x-ndjson",
+  csv: "text/csv",
+  html: "text/html",
+};
+const PAGE_SIZE = 500;
+
+type Plan = Record<string, unknown>;
+
+function quote(value: unknown): string {
+  // Quote a value for use inside a PostgREST logic filter
+  return '"' + String(value).replaceAll("\\", "\\\\").replaceAll('"', '\\"') + '"';
+}
+
+async function* iterPlans(sb: SupabaseClient, userId: string | null): AsyncGenerator<Plan> {
+  let cursor: [unknown, unknown] | null = null;
+  while (true) {
+    let query = sb.from("plans").select(EXPORT_COLUMNS.join(","));
+    if (userId) query = query.eq("user_id", userId);
+    if (cursor) {
+      const [createdAt, planId] = [quote(cursor[0]), quote(cursor[1])];
+      query = query.or(`created_at.lt.${createdAt},and(created_at.eq.${createdAt},id.lt.${planId})`);
+    }
+    const { data, error } = await query
+      .order("created_at", { ascending: false })
+      .order("id", { ascending: false })
+      .limit(PAGE_SIZE);
+    if (error) throw error;
+    const rows = (data ?? []) as Plan[];
+    yield* rows;
+    if (rows.length < PAGE_SIZE) return;
+    const last = rows[rows.length - 1];
+    cursor = [last.created_at, last.id];
+  }
+}
+
+async function* iterJsonl(plans: AsyncIterable<Plan>): AsyncGenerator<string> {
+  for await (const plan of plans) {
+    yield JSON.stringify(Object.fromEntries(EXPORT_COLUMNS.map((col) => [col, plan[col] ?? null]))) + "\n";
+  }
+}
+
+function csvField(value: unknown): string {
+  const text = value == null ? "" : String(value);
+  return /[",\r\n]/.test(text) ? '"' + text.replaceAll('"', '""') + '"' : text;
+}
+
+async function* iterCsv(plans: AsyncIterable<Plan>): AsyncGenerator<string> {
+  yield EXPORT_COLUMNS.join(",") + "\r\n";
+  for await (const plan of plans) {
+    yield EXPORT_COLUMNS.map((col) => csvField(plan[col])).join(",") + "\r\n";
+  }
+}
+
+function escapeHtml(value: unknown): string {
+  return String(value ?? "")
+    .replaceAll("&", "&amp;")
+    .replaceAll("<", "&lt;")
+    .replaceAll(">", "&gt;")
+    .replaceAll('"', "&quot;")
+    .replaceAll("'", "&#x27;");
+}
+
+async function* iterDocument(plans: AsyncIterable<Plan>, title: string): AsyncGenerator<string> {
+  yield `<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>${escapeHtml(title)}</title>
+<style>
+body { font-family: sans-serif; margin: 2rem; color: #333; }
+.plan { page-break-after: always; margin-bottom: 2rem; }
+.plan h2 { margin-bottom: 0.25rem; }
+.meta { color: #666; font-size: 0.9em; margin-bottom: 1rem; }
+.content { white-space: pre-wrap; line-height: 1.4; }
+</style>
+</head>
+<body>
+<h1>${escapeHtml(title)}</h1>
+`;
+  for await (const plan of plans) {
+    const planTypeName = plan.type === "meal" ? "Meal Plan" : "Exercise Plan";
+    yield `<div class="plan">
+<h2>${planTypeName} - ${escapeHtml(plan.goal)}</h2>
+<div class="meta">${escapeHtml(plan.created_at)}</div>
+<div class="content">${escapeHtml(plan.content)}</div>
+</div>
+`;
+  }
+  yield "</body>\n</html>\n";
+}
+
+function iterExport(format: string, plans: AsyncIterable<Plan>, allUsers: boolean): AsyncGenerator<string> {
+  if (format === "jsonl") return iterJsonl(plans);
+  if (format === "csv") return iterCsv(plans);
+  return iterDocument(plans, allUsers ? "Plan History - All Users" : "Plan History");
+}
+
+function toStream(chunks: AsyncGenerator<string>): ReadableStream<Uint8Array> {
+  // Pull-based, so the next page is only fetched once the client has read the last one
+  const encoder = new TextEncoder();
+  return new ReadableStream({
+    async pull(controller) {
+      const { value, done } = await chunks.next();
+      if (done) controller.close();
+      else controller.enqueue(encoder.encode(value));
+    },
+    async cancel() {
+      await chunks.return(undefined);
+    },
+  });
+}
+
+Deno.serve(async (req) => {
+  if (req.method !== "GET") return new Response("Method not allowed", { status: 405 });
+  const ticketId = new URL(req.url).searchParams.get("ticket");
+  if (!ticketId) return new Response("Missing export ticket", { status: 400 });
+
+  const sb = createClient(Deno.env.get("SUPABASE_URL")!, Deno.env.get("SUPABASE_SERVICE_ROLE_KEY")!, {
+    auth: { persistSession: false },
+  });
+
+  // Deleting the ticket claims it, so a second request with the same link fails
+  const { data: ticket } = await sb
+    .from("export_tickets")
+    .delete()
+    .eq("id", ticketId)
+    .gt("expires_at", new Date().toISOString())
+    .select("user_id,format,all_users")
+    .maybeSingle();
+  if (!ticket) return new Response("This export link has expired or was already used.", { status: 404 });
+
+  if (ticket.all_users) {
+    const { data: admin } = await sb.from("admins").select("user_id").eq("user_id", ticket.user_id).maybeSingle();
+    if (!admin) return new Response("Forbidden", { status: 403 });
+  }
+
+  const scope = ticket.all_users ? "all-users" : "my";
+  const stamp = new Date().toISOString().replace(/[-:]/g, "").replace("T", "-").slice(0, 15);
+  const plans = iterPlans(sb, ticket.all_users ? null : ticket.user_id);
+  return new Response(toStream(iterExport(ticket.format, plans, ticket.all_users)), {
+    headers: {
+      "Content-Type": `${CONTENT_TYPES[ticket.format]}; charset=utf-8`,
+      "Content-Disposition": `attachment; filename="${scope}-plans-${stamp}.${ticket.format}"`,
+      "Cache-Control": "no-store",
+    },
+  });
+});
@@ -0,0 +1,94 @@
+-- Exact plan statistics and pre-aggregated daily/weekly rollups for the profile page.
+--
+-- plan_rollups is maintained by a trigger on plans, so every insert, update or
+-- delete adjusts exactly the affected buckets and reads never scan plans.
+
+alter table public.plans
+    add column if not exists avg_daily_calories numeric,
+    add column if not exists avg_daily_protein numeric;
+
+-- Backs the count queries on the profile page and the keyset export cursor
+create index if not exists plans_user_type_idx on public.plans (user_id, type);
+create index if not exists plans_user_created_idx on public.plans (user_id, created_at desc, id desc);
+
+create table if not exists public.plan_rollups (
+    user_id uuid not null,
+    period text not null check (period in ('day', 'week')),
+    period_start date not null,
+    type text not null,
+    goal text not null,
+    plan_count integer not null default 0,
+    calories_sum numeric not null default 0,
+    protein_sum numeric not null default 0,
+    nutrition_count integer not null default 0,
+    primary key (user_id, period, period_start, type, goal)
+);
+
+alter table public.plan_rollups enable row level security;
+
+drop policy if exists "Users read own rollups" on public.plan_rollups;
+create policy "Users read own rollups" on public.plan_rollups
+    for select using (auth.uid() = user_id);
+
+create or replace function public.apply_plan_rollup(p public.plans, sign integer)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    period_name text;
+    bucket date;
+    has_nutrition integer := case when p.avg_daily_calories is not null then 1 else 0 end;
+begin
+    foreach period_name in array array['day', 'week'] loop
+        bucket := date_trunc(period_name, p.created_at::timestamp)::date;
+        insert into plan_rollups as r
+            (user_id, period, period_start, type, goal, plan_count, calories_sum, protein_sum, nutrition_count)
+        values
+            (p.user_id, period_name, bucket, p.type, coalesce(p.goal, ''), sign,
+             sign * coalesce(p.avg_daily_calories, 0), sign * coalesce(p.avg_daily_protein, 0), sign * has_nutrition)
+        on conflict (user_id, period, period_start, type, goal) do update set
+            plan_count = r.plan_count + excluded.plan_count,
+            calories_sum = r.calories_sum + excluded.calories_sum,
+            protein_sum = r.protein_sum + excluded.protein_sum,
+            nutrition_count = r.nutrition_count + excluded.nutrition_count;
+    end loop;
+    delete from plan_rollups
+        where user_id = p.user_id and plan_count <= 0;
+end;
+$$;
+
+create or replace function public.plans_rollup_trigger()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform apply_plan_rollup(old, -1);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform apply_plan_rollup(new, 1);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists plans_rollup on public.plans;
+create trigger plans_rollup
+    after insert or delete or update of user_id, type, goal, created_at, avg_daily_calories, avg_daily_protein
+    on public.plans
+    for each row execute function public.plans_rollup_trigger();
+
+-- Backfill rollups for plans created before this migration
+delete from public.plan_rollups;
+insert into public.plan_rollups
+    (user_id, period, period_start, type, goal, plan_count, calories_sum, protein_sum, nutrition_count)
+select user_id, period, date_trunc(period, created_at::timestamp)::date, type, coalesce(goal, ''),
+       count(*), coalesce(sum(avg_daily_calories), 0), coalesce(sum(avg_daily_protein), 0),
+       count(avg_daily_calories)
+from public.plans
+cross join (values ('day'), ('week')) as periods(period)
+group by user_id, period, date_trunc(period, created_at::timestamp)::date, type, coalesce(goal, '');
@@ -0,0 +1,29 @@
+-- Admin accounts and the read access they need for the all-users plan export.
+--
+-- Rows are managed from the SQL editor or with the service role; there is no
+-- insert/update policy, so users cannot promote themselves.
+
+create table if not exists public.admins (
+    user_id uuid primary key references auth.users (id) on delete cascade,
+    created_at timestamptz not null default now()
+);
+
+alter table public.admins enable row level security;
+
+drop policy if exists "Users see own admin row" on public.admins;
+create policy "Users see own admin row" on public.admins
+    for select using (auth.uid() = user_id);
+
+create or replace function public.is_admin()
+returns boolean
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select exists (select 1 from admins where user_id = auth.uid());
+$$;
+
+drop policy if exists "Admins read all plans" on public.plans;
+create policy "Admins read all plans" on public.plans
+    for select using (public.is_admin());
@@ -0,0 +1,37 @@
+-- Single-use tickets for the export-plans Edge Function.
+--
+-- The app inserts a ticket as the signed-in user and hands the browser a link
+-- carrying only the ticket id. The function deletes the ticket on first use
+-- and streams the export straight from Postgres, so no export ever passes
+-- through the Streamlit server's memory.
+
+create table if not exists public.export_tickets (
+    id uuid primary key default gen_random_uuid(),
+    user_id uuid not null references auth.users (id) on delete cascade,
+    format text not null check (format in ('jsonl', 'csv', 'html')),
+    all_users boolean not null default false,
+    created_at timestamptz not null default now(),
+    expires_at timestamptz not null default now() + interval '5 minutes'
+);
+
+alter table public.export_tickets enable row level security;
+
+-- Users may only mint tickets for themselves, short-lived, and only admins
+-- may mint all-users tickets
+drop policy if exists "Users create own export tickets" on public.export_tickets;
+create policy "Users create own export tickets" on public.export_tickets
+    for insert with check (
+        auth.uid() = user_id
+        and expires_at <= now() + interval '5 minutes'
+        and (not all_users or public.is_admin())
+    );
+
+-- Needed to read back the generated id from the insert
+drop policy if exists "Users see own export tickets" on public.export_tickets;
+create policy "Users see own export tickets" on public.export_tickets
+    for select using (auth.uid() = user_id);
+
+create index if not exists export_tickets_expires_idx on public.export_tickets (expires_at);
+
+-- Plans ordered newest first across all users, for the all-users export cursor
+create index if not exists plans_created_idx on public.plans (created_at desc, id desc);
@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+from unittest import mock
+import pytest
+import gemini
+from gemini import replace_plan_day, split_plan_days
+
+EXERCISE_PLAN = """Here is your plan.
+
+**Day 6: Upper Body**
+**Warm-up:**
+- 5 min rowing
+**Main Workout:**
+- Push-ups 3x12
+
+**Day 7: Lower Body**
+**Warm-up:**
+- 5 min jog
+**Main Workout:**
+- Squats 3x10
+**Cooldown:**
+- Stretching
+
+**Shopping List:**
+- Resistance band
+
+**Tips:**
+- Sleep 8 hours
+"""
+
+MARKDOWN_PLAN = """## Day 1
+#### Warm-up
+- Jumping jacks
+#### Main Workout
+- Lunges
+
+## Day 2
+#### Warm-up
+- Skipping
+#### Main Workout
+- Rows
+
+## Weekly Tips
+- Stay hydrated
+"""
+
+
+def test_split_round_trips():
+    for plan in (EXERCISE_PLAN, MARKDOWN_PLAN, "No days here"):
+        assert "".join(text for _, text in split_plan_days(plan)) == plan
+
+
+def test_split_keeps_bold_subsections_with_their_day():
+    segments = split_plan_days("**Day 3: Lower Body**\n**Warm-up:**\n- 5 min jog\n**Main Workout:**\n- Squats\n")
+    assert segments == [(3, "**Day 3: Lower Body**\n**Warm-up:**\n- 5 min jog\n**Main Workout:**\n- Squats\n")]
+
+
+def test_split_separates_plan_level_sections_after_last_day():
+    segments = split_plan_days(EXERCISE_PLAN)
+    assert [day for day, _ in segments] == [None, 6, 7, None]
+    assert "**Cooldown:**" in segments[2][1] and "Squats" in segments[2][1]
+    assert segments[3][1].startswith("**Shopping List:**")
+
+
+def test_split_markdown_subheadings_stay_with_day():
+    segments = split_plan_days(MARKDOWN_PLAN)
+    assert [day for day, _ in segments] == [1, 2, None]
+    assert "#### Main Workout\n- Rows" in segments[1][1]
+    assert segments[2][1] == "## Weekly Tips\n- Stay hydrated\n"
+
+
+def test_replace_last_day_keeps_trailing_sections_and_drops_old_subsections():
+    new_day = "**Day 7: Full Body**\n**Warm-up:**\n- Bands\n**Main Workout:**\n- Deadlifts 3x5"
+    patched = replace_plan_day(EXERCISE_PLAN, 7, new_day)
+    assert "Deadlifts" in patched and "Squats" not in patched and "5 min jog" not in patched
+    assert patched.endswith("**Shopping List:**\n- Resistance band\n\n**Tips:**\n- Sleep 8 hours\n")
+    assert "Push-ups 3x12" in patched
+
+
+def test_replace_middle_day_with_markdown_subheadings():
+    patched = replace_plan_day(MARKDOWN_PLAN, 1, "## Day 1\n#### Warm-up\n- High knees\n#### Main Workout\n- Burpees")
+    assert "Lunges" not in patched and "Jumping jacks" not in patched
+    assert "## Day 1\n#### Warm-up\n- High knees\n#### Main Workout\n- Burpees\n\n## Day 2" in patched
+    assert patched.endswith("## Weekly Tips\n- Stay hydrated\n")
+
+
+def test_replace_missing_day_raises():
+    with pytest.raises(ValueError):
+        replace_plan_day(MARKDOWN_PLAN, 5, "## Day 5\n- Rest")
+
+
+def _fake_client(text):
+    return SimpleNamespace(models=SimpleNamespace(generate_content=lambda model, contents: SimpleNamespace(text=text)))
+
+
+def test_regenerate_day_keeps_whole_day_from_model_output():
+    response = ("Sure! Here it is:\n\n**Day 7: Lower Body**\n**Warm-up:**\n- 5 min jog\n"
+                "**Main Workout:**\n- Squats\n**Tips:**\n- Go slow\n\n**Day 1: Extra**\n- ignored\n")
+    with mock.patch.object(gemini, 'get_client', return_value=_fake_client(response)):
+        segment = gemini._regenerate_day("prompt", 7)
+    assert segment == "**Day 7: Lower Body**\n**Warm-up:**\n- 5 min jog\n**Main Workout:**\n- Squats\n**Tips:**\n- Go slow"
+
+
+def test_regenerate_day_rejects_wrong_day():
+    with mock.patch.object(gemini, 'get_client', return_value=_fake_client("**Day 2: Rest**\n- Walk")):
+        with pytest.raises(ValueError):
+            gemini._regenerate_day("prompt", 7)
@@ -0,0 +1,63 @@
+import os
+import stat
+from unittest import mock
+import pytest
+from streamlit.runtime.scriptrunner_utils.exceptions import RerunException
+import profiling
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / "profiles")
+    monkeypatch.setattr(profiling, "DEFAULT_PROFILE_DIR", path)
+    monkeypatch.setattr(profiling.st, "secrets", {})
+    monkeypatch.delenv("PROFILE_DIR", raising=False)
+    return path
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_reports_are_private(profile_dir):
+    def show_page():
+        return "done"
+
+    with mock.patch.object(profiling.st, "warning") as warning:
+        assert profiling._profiled(show_page) == "done"
+    warning.assert_not_called()
+    assert _mode(profile_dir) == 0o700
+    files = os.listdir(profile_dir)
+    assert len(files) == 3
+    assert all(_mode(os.path.join(profile_dir, name)) == 0o600 for name in files)
+
+
+def test_existing_default_dir_is_tightened(profile_dir):
+    os.makedirs(profile_dir, mode=0o777)
+    os.chmod(profile_dir, 0o777)
+    profiling._profile_dir()
+    assert _mode(profile_dir) == 0o700
+
+
+def test_default_dir_symlink_is_refused(profile_dir, tmp_path):
+    os.symlink(tmp_path, profile_dir)
+    with pytest.raises(RuntimeError):
+        profiling._profile_dir()
+
+
+def test_write_failure_keeps_page_result(profile_dir):
+    with mock.patch.object(profiling, "_profile_dir", side_effect=OSError("disk full")), \
+            mock.patch.object(profiling.st, "warning") as warning:
+        assert profiling._profiled(lambda: 42) == 42
+    assert "disk full" in warning.call_args.args[0]
+
+
+def test_write_failure_keeps_rerun(profile_dir):
+    def show_page():
+        raise RerunException(None)
+
+    with mock.patch.object(profiling, "_profile_dir", side_effect=OSError("disk full")), \
+            mock.patch.object(profiling.st, "warning") as warning:
+        with pytest.raises(RerunException):
+            profiling._profiled(show_page)
+    warning.assert_called_once()
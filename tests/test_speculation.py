@@ -0,0 +1,108 @@
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+from unittest import mock
+import pytest
+import auth
+import cache
+import speculation
+
+PROFILE = {
+    'fitness_goal': 'Muscle Gain',
+    'default_ingredients': 'chicken, rice',
+    'dietary_preferences': '',
+    'default_equipment': '',
+}
+MEAL_KWARGS = speculation.default_requests(PROFILE)['meal']
+
+
+@pytest.fixture(autouse=True)
+def shared_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, '_backend', cache.SQLiteCache(str(tmp_path / 'cache.sqlite3')))
+
+
+@pytest.fixture
+def model(monkeypatch):
+    calls = []
+
+    def generate_meal_plan(**kwargs):
+        calls.append(kwargs)
+        return f"plan {len(calls)}"
+
+    monkeypatch.setitem(speculation.GENERATORS, 'meal', generate_meal_plan)
+    return calls
+
+
+@pytest.fixture
+def session_state(monkeypatch):
+    state = SimpleNamespace()
+    state.get = lambda name, default=None: getattr(state, name, default)
+    state.pop = lambda name, default=None: state.__dict__.pop(name, default)
+    monkeypatch.setattr(auth.st, 'session_state', state)
+    return state
+
+
+def _wait_for_speculation():
+    deadline = time.time() + 5
+    while speculation._inflight and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_speculative_plan_is_served_once(model):
+    speculation.speculate_defaults('user-1', PROFILE)
+    _wait_for_speculation()
+
+    assert speculation.generate('user-1', 'meal', **MEAL_KWARGS) == "plan 1"
+    assert speculation.generate('user-1', 'meal', **MEAL_KWARGS) == "plan 2"
+    stats = speculation.speculation_stats()
+    assert (stats['started'], stats['hit'], stats['miss']) == (1, 1, 1)
+
+
+def test_other_users_do_not_share_results(model):
+    speculation.speculate_defaults('user-1', PROFILE)
+    _wait_for_speculation()
+
+    assert speculation.generate('user-2', 'meal', **MEAL_KWARGS) == "plan 2"
+    assert speculation.speculation_stats()['miss'] == 1
+
+
+def test_failed_generation_is_not_stored(monkeypatch):
+    monkeypatch.setitem(speculation.GENERATORS, 'meal', lambda **kwargs: "Error generating meal plan: quota")
+    speculation.speculate_defaults('user-1', PROFILE)
+    _wait_for_speculation()
+
+    assert speculation._take_result('user-1', speculation._key('meal', MEAL_KWARGS)) is None
+
+
+def test_resume_session_speculates_defaults(monkeypatch, session_state):
+    session_state.__dict__.update(authenticated=False, resume_attempted=False, current_page='landing')
+    user = SimpleNamespace(id='user-1', email='a@example.com')
+    client = SimpleNamespace(auth=SimpleNamespace(
+        refresh_session=lambda token: SimpleNamespace(user=user, session=SimpleNamespace(refresh_token='next'))))
+    snapshot = {'user_data': PROFILE, 'plan_history': [], 'cached_at': time.time()}
+    monkeypatch.setattr(auth.st, 'context', SimpleNamespace(cookies={auth.SESSION_COOKIE: 'token'}))
+    monkeypatch.setattr(auth, 'get_supabase', lambda: client)
+    monkeypatch.setattr(auth, '_snapshot_cache', lambda: SimpleNamespace(get=lambda user_id: snapshot))
+    monkeypatch.setattr(auth, '_persist_refresh_token', lambda token: None)
+    monkeypatch.setattr(auth, '_fetch_is_admin', lambda user_id: False)
+
+    with mock.patch.object(auth, 'speculate_defaults') as speculate:
+        auth.resume_session()
+
+    assert session_state.authenticated
+    speculate.assert_called_once_with('user-1', PROFILE)
+
+
+@pytest.mark.parametrize('ingredients, speculated', [('chicken, rice', False), ('tofu', True)])
+def test_revalidation_speculates_changed_defaults(monkeypatch, session_state, ingredients, speculated):
+    fresh = dict(PROFILE, default_ingredients=ingredients)
+    future = Future()
+    future.set_result((fresh, []))
+    session_state.__dict__.update(user_id='user-1', user_data=dict(PROFILE), _revalidation=future)
+    monkeypatch.setattr(auth, '_save_snapshot', lambda user_id: None)
+
+    with mock.patch.object(auth, 'speculate_defaults') as speculate:
+        auth.apply_revalidation()
+
+    assert session_state.user_data == fresh
+    assert speculate.called is speculated